@@ -1,16 +1,21 @@
-from app.services.llm.groq_client import GroqClient
+from app.services.llm.groq_client import GroqClient, get_groq_client
+from app.services.cache.agent_cache import memoize_validation, prompt_titles
 from app.models.schemas import ClinicalValidation
 import logging
-from typing import List
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
 class ClinicalExpertAgent:
     """Clinical Expert validation agent"""
     
-    def __init__(self):
-        self.llm_client = GroqClient()
+    name = "clinical_expert"
+    PROMPT_VERSION = 1
     
+    def __init__(self, llm_client: Optional[GroqClient] = None):
+        self.llm_client = llm_client or get_groq_client()
+    
+    @memoize_validation(ClinicalValidation)
     async def validate(self, answer: str, sources: List[dict]) -> ClinicalValidation:
         """Validate clinical relevance and safety"""
         
@@ -24,7 +29,7 @@ Focus on:
 Provide scores between 0.0-1.0 and clear reasoning."""
 
         source_summary = "\n".join([
-            f"- {s.get('title', 'Unknown')[:80]}" for s in sources[:5]
+            f"- {title}" for title in prompt_titles(sources)
         ])
 
         prompt = f"""Evaluate this medical answer from a clinical perspective:
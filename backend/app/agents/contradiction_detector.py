@@ -1,16 +1,21 @@
-from app.services.llm.groq_client import GroqClient
+from app.services.llm.groq_client import GroqClient, get_groq_client
+from app.services.cache.agent_cache import memoize_validation, prompt_titles
 from app.models.schemas import ContradictionAnalysis
 import logging
-from typing import List
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
 class ContradictionDetectorAgent:
     """Contradiction detection agent"""
     
-    def __init__(self):
-        self.llm_client = GroqClient()
+    name = "contradiction_detector"
+    PROMPT_VERSION = 1
     
+    def __init__(self, llm_client: Optional[GroqClient] = None):
+        self.llm_client = llm_client or get_groq_client()
+    
+    @memoize_validation(ContradictionAnalysis)
     async def validate(self, answer: str, sources: List[dict]) -> ContradictionAnalysis:
         """Detect contradictions across sources"""
         
@@ -24,7 +29,7 @@ Focus on:
 Rate contradiction level as: low, medium, or high."""
 
         source_summary = "\n".join([
-            f"- {s.get('title', 'Unknown')[:80]}" for s in sources[:5]
+            f"- {title}" for title in prompt_titles(sources)
         ])
 
         prompt = f"""Analyze potential contradictions in this medical information:
@@ -0,0 +1,128 @@
+from app.services.llm.groq_client import GroqClient, get_groq_client
+from app.services.cache.agent_cache import memoize_validation, prompt_titles
+from app.models.schemas import ClinicalValidation, StatisticalValidation, ContradictionAnalysis
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FusedResult = Tuple[ClinicalValidation, StatisticalValidation, ContradictionAnalysis]
+
+class FusedValidatorAgent:
+    """Clinical, statistical and contradiction assessments in one structured LLM call"""
+
+    name = "fused_validator"
+    PROMPT_VERSION = 1
+
+    def __init__(self, llm_client: Optional[GroqClient] = None):
+        self.llm_client = llm_client or get_groq_client()
+
+    @memoize_validation((ClinicalValidation, StatisticalValidation, ContradictionAnalysis))
+    async def validate(self, answer: str, sources: List[dict]) -> FusedResult:
+        """Run all three assessments; raises ValueError if the reply cannot be parsed"""
+
+        system_prompt = """You are a panel of three medical reviewers evaluating an answer drawn from medical literature:
+1. A senior clinical expert: clinical relevance, applicability and patient safety
+2. A biostatistics expert: statistical methodology, sample sizes and study design
+3. A literature analyst: conflicting findings and consensus across the sources
+
+Reply with a single JSON object only. Scores are between 0.0 and 1.0."""
+
+        source_summary = "\n".join([
+            f"- {title}" for title in prompt_titles(sources)
+        ])
+
+        prompt = f"""Evaluate this medical answer:
+
+Answer: {answer}
+
+Sources:
+{source_summary}
+
+Return JSON with exactly this structure:
+{{
+  "clinical": {{
+    "clinical_relevance": <score>,
+    "confidence": <score>,
+    "safety_concerns": [<concern>, ...],
+    "reasoning": "<brief explanation>"
+  }},
+  "statistical": {{
+    "statistical_score": <score>,
+    "confidence": <score>,
+    "methodology_notes": "<concerns or strengths>",
+    "reasoning": "<brief explanation>"
+  }},
+  "contradiction": {{
+    "contradiction_level": "low" | "medium" | "high",
+    "confidence": <score>,
+    "conflicting_sources": [<source>, ...],
+    "reasoning": "<brief explanation>"
+  }}
+}}
+Use empty lists when there are no safety concerns or conflicting sources."""
+
+        response = await self.llm_client.generate(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            max_tokens=700,
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        return parse_fused_response(response)
+
+def parse_fused_response(response: str) -> FusedResult:
+    """Parse the fused JSON reply into the three validation models"""
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):]
+    try:
+        data = json.loads(text)
+        clinical = data["clinical"]
+        statistical = data["statistical"]
+        contradiction = data["contradiction"]
+
+        level = str(contradiction["contradiction_level"]).strip().lower()
+        if level not in ("low", "medium", "high"):
+            raise ValueError(f"invalid contradiction_level {level!r}")
+
+        return (
+            ClinicalValidation(
+                confidence=_score(clinical["confidence"]),
+                reasoning=str(clinical.get("reasoning", "Clinical evaluation completed.")),
+                flags=[],
+                clinical_relevance=_score(clinical["clinical_relevance"]),
+                safety_concerns=_string_list(clinical.get("safety_concerns"))
+            ),
+            StatisticalValidation(
+                confidence=_score(statistical["confidence"]),
+                reasoning=str(statistical.get("reasoning", "Statistical evaluation completed.")),
+                flags=[],
+                statistical_score=_score(statistical["statistical_score"]),
+                methodology_notes=str(statistical.get("methodology_notes", ""))
+            ),
+            ContradictionAnalysis(
+                confidence=_score(contradiction["confidence"]),
+                reasoning=str(contradiction.get("reasoning", "No significant contradictions detected.")),
+                flags=[],
+                contradiction_level=level,
+                conflicting_sources=_string_list(contradiction.get("conflicting_sources"))
+            )
+        )
+    except (KeyError, TypeError, AttributeError, ValueError) as e:
+        raise ValueError(f"Unparseable fused validation response: {e}") from e
+
+def _score(value: Any) -> float:
+    return max(0.0, min(1.0, float(value)))
+
+def _string_list(value: Any) -> List[str]:
+    """Normalize a list-or-string field, dropping 'None identified' placeholders"""
+    if not value:
+        return []
+    items = value if isinstance(value, list) else [value]
+    return [
+        str(item) for item in items
+        if str(item).strip().lower() not in ("none", "none identified", "")
+    ]
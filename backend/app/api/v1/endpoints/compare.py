@@ -32,7 +32,7 @@ async def compare_searches(
             search_id=search_id,
             query=search["query"],
             answer=search["answer"],
-            overall_confidence=search["overall_confidence"],
+            overall_confidence=search.get("overall_confidence"),
             sources_count=search["sources_count"]
         ))
     
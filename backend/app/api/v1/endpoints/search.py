@@ -1,39 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import SearchRequest, SearchResponse, HealthCheck
+from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.metrics import ERRORS, timed
+from app.core.tracing import set_attributes
+from app.models.schemas import (
+    SearchRequest, SearchResponse, SourceEvidence, MultiAgentValidation, ValidationTier, HealthCheck
+)
 from app.services.rag.rag_pipeline import RAGPipeline
-from app.services.agents.multi_agent_system import MultiAgentValidator
+from app.services.rag.pipeline_manager import RAGPipelineManager
+from app.services.cache.response_cache import ResponseCache, get_response_cache
+from app.services.cache.semantic_cache import SemanticCache, get_semantic_cache
+from app.services.cache.agent_cache import get_agent_cache
+from app.services.validation.tiers import TieredValidator
+from app.services.validation.validators import validation_failed
 from app.services.database.search_history import SearchHistoryService
-from app.api.dependencies import get_current_user_optional
+from app.api.dependencies import get_current_admin, get_current_user, get_current_user_optional
 import time
+import json
 import logging
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Initialize services (singleton pattern)
-_rag_pipeline = None
 _validator = None
 
-def get_rag_pipeline() -> RAGPipeline:
-    global _rag_pipeline
-    if _rag_pipeline is None:
-        _rag_pipeline = RAGPipeline()
-    return _rag_pipeline
+async def get_rag_pipeline() -> RAGPipeline:
+    # Built once at startup; a request arriving earlier waits for that build
+    return await RAGPipelineManager.get_pipeline()
 
-def get_validator() -> MultiAgentValidator:
+def get_validator() -> TieredValidator:
     global _validator
     if _validator is None:
-        _validator = MultiAgentValidator()
+        _validator = TieredValidator()
     return _validator
 
 @router.post("/search", response_model=SearchResponse)
 async def search_medical_literature(
     request: SearchRequest,
     rag_pipeline: RAGPipeline = Depends(get_rag_pipeline),
-    validator: MultiAgentValidator = Depends(get_validator),
+    validator: TieredValidator = Depends(get_validator),
+    response_cache: Optional[ResponseCache] = Depends(get_response_cache),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache),
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     """Search medical literature with RAG and multi-agent validation"""
@@ -41,39 +53,68 @@ async def search_medical_literature(
     
     try:
         logger.info(f"Search request: {request.query}")
+        set_attributes(top_k=request.top_k, validation=request.validation.value, filtered=request.filters is not None)
         
-        # Execute RAG search with hybrid retrieval
-        answer, sources = await rag_pipeline.search(request)
+        async def run_search() -> dict:
+            # Paraphrases of a recent query with the same filters reuse its answer
+            if semantic_cache is not None:
+                embedding = await rag_pipeline.embed_query(request.query)
+                scope = _request_scope(request, rag_pipeline)
+                hit = semantic_cache.lookup(embedding, scope, rag_pipeline.corpus_version)
+                if hit is not None:
+                    cached, similarity = hit
+                    logger.info(f"Semantic cache hit (cosine {similarity:.3f})")
+                    set_attributes(semantic_cache_similarity=round(similarity, 4))
+                    return cached
+            
+            # Execute RAG search with hybrid retrieval
+            answer, sources = await rag_pipeline.search(request)
+            
+            # Multi-agent validation at the requested tier
+            validation, validation_tier, llm_validation = await validator.validate(
+                request.validation,
+                query=request.query,
+                answer=answer,
+                sources=sources,
+                budget_ms=request.validation_budget_ms
+            )
+            result = jsonable_encoder({
+                "answer": answer,
+                "sources": sources,
+                "validation": validation,
+                "validation_tier": validation_tier,
+                "llm_validation": llm_validation
+            })
+            
+            if semantic_cache is not None and sources and _cacheable(request, result):
+                semantic_cache.add(
+                    embedding, scope, rag_pipeline.corpus_version, result,
+                    paper_ids=[source.paper_id for source in sources]
+                )
+            return result
         
-        # Multi-agent validation
-        validation = await validator.validate(
-            query=request.query,
-            answer=answer,
-            sources=sources
-        )
+        # Identical requests share one cached (or in-flight) result
+        if response_cache is not None:
+            result = await response_cache.get_or_compute(
+                _response_cache_key(request, rag_pipeline),
+                run_search,
+                cacheable=lambda value: _cacheable(request, value)
+            )
+        else:
+            result = await run_search()
         
-        processing_time = (time.time() - start_time) * 1000
+        answer = result["answer"]
+        sources = [SourceEvidence(**source) for source in result["sources"]]
+        validation = MultiAgentValidation(**result["validation"]) if result["validation"] else None
+        validation_tier = ValidationTier(result["validation_tier"]) if result["validation_tier"] else None
+        llm_validation = MultiAgentValidation(**result["llm_validation"]) if result.get("llm_validation") else None
         
-        # Build response
-        response = SearchResponse(
-            query=request.query,
-            answer=answer,
-            sources=sources,
-            validation=validation,
-            processing_time_ms=processing_time,
-            timestamp=datetime.utcnow()
+        response = await _build_response(
+            request, answer, sources, validation, validation_tier, start_time, current_user,
+            llm_validation=llm_validation
         )
         
-        # Save history if authenticated
-        if current_user:
-            user_id = str(current_user["_id"])
-            search_id = await SearchHistoryService.save_search(
-                user_id, response, request.filters
-            )
-            response.search_id = search_id
-            logger.info(f"Search saved with ID: {search_id}")
-        
-        logger.info(f"Search completed in {processing_time:.0f}ms")
+        logger.info(f"Search completed in {response.processing_time_ms:.0f}ms")
         return response
         
     except FileNotFoundError as e:
@@ -84,18 +125,219 @@ async def search_medical_literature(
         )
     except Exception as e:
         logger.error(f"Search error: {e}", exc_info=True)
+        ERRORS.labels("search").inc()
         raise HTTPException(
             status_code=500,
             detail=f"Search failed: {str(e)}"
         )
 
+@router.post("/search/stream")
+async def stream_medical_literature(
+    request: SearchRequest,
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline),
+    validator: TieredValidator = Depends(get_validator),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """Stream search results as Server-Sent Events.
+    
+    Events, in order: `sources` (ranked SourceEvidence list), `token`
+    (answer text deltas), `validation` (MultiAgentValidation, omitted when
+    the request's validation tier is `none`), `llm_validation` (auto tier
+    only, when the LLM verdict arrives within the budget) and `done`
+    (search_id, validation tier and processing time). Failures emit a
+    single `error` event.
+    """
+    start_time = time.time()
+    
+    async def event_stream():
+        try:
+            logger.info(f"Streaming search request: {request.query}")
+            
+            sources, fallback_answer = await rag_pipeline.retrieve(request)
+            yield _sse_event("sources", sources)
+            
+            if fallback_answer is not None:
+                answer = fallback_answer
+                yield _sse_event("token", {"text": answer})
+            else:
+                context = await rag_pipeline.build_rag_context(
+                    request.query, sources, settings.MAX_CONTEXT_TOKENS
+                )
+                parts = []
+                async for delta in rag_pipeline.generate_answer_stream(
+                    query=request.query,
+                    context=context
+                ):
+                    parts.append(delta)
+                    yield _sse_event("token", {"text": delta})
+                answer = "".join(parts).strip()
+            
+            # The heuristic verdict goes out before the auto tier waits on the LLM
+            validation, validation_tier, llm_validation = None, None, None
+            async for stage, verdict, verdict_tier in validator.validate_stages(
+                request.validation,
+                query=request.query,
+                answer=answer,
+                sources=sources,
+                budget_ms=request.validation_budget_ms
+            ):
+                if stage == "validation":
+                    validation, validation_tier = verdict, verdict_tier
+                else:
+                    llm_validation = verdict
+                yield _sse_event(stage, verdict)
+            
+            response = await _build_response(
+                request, answer, sources, validation, validation_tier, start_time, current_user,
+                llm_validation=llm_validation
+            )
+            yield _sse_event("done", {
+                "search_id": response.search_id,
+                "validation_tier": response.validation_tier,
+                "processing_time_ms": response.processing_time_ms
+            })
+            logger.info(f"Streaming search completed in {response.processing_time_ms:.0f}ms")
+            
+        except FileNotFoundError as e:
+            logger.error(f"VectorDB not found: {e}")
+            yield _sse_event("error", {
+                "detail": "Vector database not found. Please ensure ChromaDB is properly initialized."
+            })
+        except Exception as e:
+            logger.error(f"Streaming search error: {e}", exc_info=True)
+            ERRORS.labels("search").inc()
+            yield _sse_event("error", {"detail": f"Search failed: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _build_response(
+    request: SearchRequest,
+    answer: str,
+    sources: List[SourceEvidence],
+    validation: Optional[MultiAgentValidation],
+    validation_tier: Optional[ValidationTier],
+    start_time: float,
+    current_user: Optional[dict],
+    llm_validation: Optional[MultiAgentValidation] = None
+) -> SearchResponse:
+    """Build the search response and save it to history if authenticated"""
+    processing_time = (time.time() - start_time) * 1000
+    
+    response = SearchResponse(
+        query=request.query,
+        answer=answer,
+        sources=sources,
+        validation=validation,
+        validation_tier=validation_tier,
+        llm_validation=llm_validation,
+        processing_time_ms=processing_time,
+        timestamp=datetime.utcnow()
+    )
+    
+    if current_user:
+        user_id = str(current_user["_id"])
+        with timed("history_write"):
+            search_id = await SearchHistoryService.save_search(
+                user_id, response, request.filters
+            )
+        response.search_id = search_id
+        logger.info(f"Search saved with ID: {search_id}")
+    
+    return response
+
+def _cacheable(request: SearchRequest, result: dict) -> bool:
+    """Whether a search result may be stored in the caches.
+    
+    An auto-tier result without an attached LLM verdict is not: the LLM
+    agents finish in the background, so the next request gets theirs. Nor
+    is one whose agents failed and returned placeholder verdicts.
+    """
+    if request.validation == ValidationTier.AUTO and not result.get("llm_validation"):
+        return False
+    verdicts = [result["validation"], result.get("llm_validation")]
+    return not any(verdict and validation_failed(MultiAgentValidation(**verdict)) for verdict in verdicts)
+
+def _response_cache_key(request: SearchRequest, rag_pipeline: RAGPipeline) -> str:
+    """Hash of a SearchRequest in canonical form, scoped to corpus and models"""
+    return ResponseCache.make_key(_canonical_request(request), _cache_namespace(rag_pipeline))
+
+def _request_scope(request: SearchRequest, rag_pipeline: RAGPipeline) -> str:
+    """Hash of everything but the query text: semantic cache hits must match it exactly"""
+    payload = _canonical_request(request)
+    del payload["query"]
+    return ResponseCache.make_key(payload, _cache_namespace(rag_pipeline))
+
+def _canonical_request(request: SearchRequest) -> dict:
+    payload = jsonable_encoder(request)
+    payload["query"] = " ".join(request.query.split())
+    filters = payload.get("filters")
+    if filters:
+        # Order of filter values does not change the result
+        for field in ("source_types", "study_types", "mesh_terms"):
+            if filters.get(field):
+                filters[field] = sorted(set(filters[field]))
+    return payload
+
+def _cache_namespace(rag_pipeline: RAGPipeline) -> dict:
+    return {
+        "corpus": rag_pipeline.corpus_version,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "embedding_backend": rag_pipeline.embedding_backend.name,
+        "llm_model": settings.GROQ_MODEL,
+        "collapse": (
+            f"{settings.COLLAPSE_POOLING}:{settings.COLLAPSE_CHUNKS_PER_PAPER}"
+            if settings.COLLAPSE_BY_PAPER else None
+        )
+    }
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.get("/cache/stats")
+async def cache_stats(rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
+    """Hit/miss counters of the search caches"""
+    response_cache = get_response_cache()
+    semantic_cache = get_semantic_cache()
+    cassette = rag_pipeline.llm_client.cassette
+    return {
+        "responses": response_cache.stats() if response_cache is not None else None,
+        "semantic_answers": semantic_cache.stats() if semantic_cache is not None else None,
+        "query_embeddings": rag_pipeline.embedding_cache.stats(),
+        "validation_agents": get_agent_cache().stats(),
+        "embedding_batches": rag_pipeline.embedding_batcher.stats(),
+        "llm_cassette": cassette.stats() if cassette is not None else None
+    }
+
+@router.post("/cache/semantic/invalidate")
+async def invalidate_semantic_cache(
+    paper_ids: List[str] = Body(..., embed=True),
+    current_user: dict = Depends(get_current_admin)
+):
+    """Drop semantic cache entries built from any of the given (updated) papers
+    
+    Admin only. The semantic cache lives in each worker's memory, so this
+    only clears the worker that serves the request; other workers keep
+    their entries until SEMANTIC_CACHE_TTL_SECONDS expires them.
+    """
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is None:
+        return {"invalidated": 0}
+    invalidated = semantic_cache.invalidate_papers(paper_ids)
+    logger.info(f"Invalidated {invalidated} semantic cache entries for {len(paper_ids)} papers")
+    return {"invalidated": invalidated}
+
 @router.get("/health", response_model=HealthCheck)
 async def health_check(rag_pipeline: RAGPipeline = Depends(get_rag_pipeline)):
     """Health check endpoint"""
     try:
         chromadb_healthy = rag_pipeline.collection.count() > 0
         groq_healthy = True  # Simplified check
-        embedding_healthy = rag_pipeline.embedding_model is not None
+        embedding_healthy = rag_pipeline.embedding_backend is not None
         
         all_healthy = chromadb_healthy and groq_healthy and embedding_healthy
         
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Application
@@ -15,6 +15,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ADMIN_EMAILS: List[str] = []  # Users allowed on maintenance endpoints; JSON list in .env
     
     # MongoDB
     MONGODB_URI: str
@@ -24,18 +25,101 @@ class Settings(BaseSettings):
     CHROMADB_PATH: str = "./vectordb"
     CHROMADB_COLLECTION: str = "medical_literature"
     
+    # Document store + BM25 index, built once from ChromaDB and memory-mapped by workers
+    SPARSE_INDEX_DIR: str = "./sparse_index"
+    
     # Groq API
     GROQ_API_KEY: str
     GROQ_MODEL: str = "llama-3.1-8b-instant"
+    GROQ_HTTP2: bool = True
+    GROQ_MAX_CONNECTIONS: int = 20
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GROQ_KEEPALIVE_EXPIRY: float = 30.0
+    GROQ_TIMEOUT: float = 60.0
+    GROQ_BASE_URL: Optional[str] = None  # e.g. the local stub from benchmarks/fake_llm.py
+    
+    # LLM cassette: record completions, or replay them without network calls
+    LLM_CASSETTE_MODE: Optional[str] = None  # record | replay
+    LLM_CASSETTE_PATH: str = "./cassettes/llm"
+    LLM_CASSETTE_LATENCY: str = "recorded"  # recorded | zero (replay delay)
     
     # Embedding Model
     EMBEDDING_MODEL: str = "microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract"
+    EMBEDDING_BACKEND: str = "fp32"  # fp32 | bf16 | int8 | onnx | onnx-int8
+    EMBEDDING_ONNX_DIR: str = "./models"
+    EMBEDDING_ACCURACY_CHECK: bool = True
+    EMBEDDING_MIN_COSINE: float = 0.99
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_TTL_SECONDS: Optional[float] = 86400
+    EMBEDDING_CACHE_PATH: Optional[str] = None  # e.g. "./cache/embeddings.sqlite3"
+    EMBEDDING_BATCH_MAX_SIZE: int = 16
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # Pipeline startup: load at app start (not on the first search) and run a warm-up query
+    PIPELINE_EAGER_LOAD: bool = True
+    PIPELINE_WARM_UP: bool = True
+    
+    # Pre-fork server (python -m app.server): workers share one loaded pipeline
+    PREFORK_WORKERS: int = 2
+    PREFORK_MEMORY_REPORT_SECONDS: float = 60.0
+    MEMORY_ENDPOINT_ENABLED: bool = False  # GET /memory: RSS/PSS of the serving worker
+    PREFORK_METRICS_DIR: str = "./metrics_multiproc"  # Shared Prometheus files; PROMETHEUS_MULTIPROC_DIR wins
+    
+    # Event-loop lag sampling, reported at /loop-lag (used by the load test); also registers the route
+    LOOP_LAG_MONITOR: bool = False
+    LOOP_LAG_INTERVAL_MS: float = 50.0
+    
+    # Observability: Prometheus /metrics and per-response Server-Timing headers
+    METRICS_ENABLED: bool = True
+    SERVER_TIMING_ENABLED: bool = True
+    TRACING_EXPORTER: Optional[str] = None  # jsonl | log | dotted path of an exporter class
+    TRACING_JSONL_PATH: str = "./traces/spans.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0  # For new traces; incoming traceparent flags win
+    
+    # Retrieval concurrency (blocking stages run on a bounded thread pool)
+    RETRIEVAL_EXECUTOR_WORKERS: int = 8
+    EMBEDDING_CONCURRENCY: int = 1  # batched forward passes in flight
+    BM25_CONCURRENCY: int = 4
+    SEMANTIC_CONCURRENCY: int = 4
+    
+    # Full search response cache (RESPONSE_CACHE_URL, e.g. redis://localhost:6379/0,
+    # shares it between workers; otherwise each worker keeps its own)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_SIZE: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: Optional[float] = 3600
+    RESPONSE_CACHE_URL: Optional[str] = None
+    
+    # Semantic answer cache: paraphrased queries with identical filters reuse a
+    # recent answer. PubMedBERT CLS vectors are anisotropic, so tune the
+    # threshold on real query pairs before enabling it.
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_SIZE: int = 1000
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_TTL_SECONDS: Optional[float] = 3600
+    
+    # LLM validation: "fused" asks for all three assessments in one JSON
+    # completion (per-agent calls on parse failure); "per_agent" makes three
+    VALIDATION_MODE: str = "fused"
+    
+    # Validation agent results, keyed on agent, prompt version and inputs
+    AGENT_CACHE_ENABLED: bool = True
+    AGENT_CACHE_SIZE: int = 5000
+    AGENT_CACHE_TTL_SECONDS: Optional[float] = 86400
+    AGENT_CACHE_PATH: Optional[str] = None  # e.g. "./cache/agents.sqlite3"
     
     # RAG Configuration
     TOP_K_RETRIEVAL: int = 10
-    MAX_CONTEXT_LENGTH: int = 2048
+    MAX_CONTEXT_LENGTH: int = 2048  # Superseded by MAX_CONTEXT_TOKENS; kept so existing .env files load
+    MAX_CONTEXT_TOKENS: int = 1500  # Hard budget for source context in the answer prompt
+    CONTEXT_TOKENIZER: Optional[str] = "unsloth/Meta-Llama-3.1-8B-Instruct"  # Same vocabulary as GROQ_MODEL
     TEMPERATURE: float = 0.7
     
+    # Result collapsing: chunks of the same paper share one result slot
+    COLLAPSE_BY_PAPER: bool = True
+    COLLAPSE_POOLING: str = "max"  # max | sum over the paper's chunk scores
+    COLLAPSE_CHUNKS_PER_PAPER: int = 1
+    RETRIEVAL_MAX_CANDIDATES: int = 800  # Per-branch cap when over-fetching for distinct papers
+    
     # Search History
     MAX_HISTORY_PER_USER: int = 100
     
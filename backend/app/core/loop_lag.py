@@ -0,0 +1,55 @@
+from collections import deque
+from typing import Deque, Optional
+import asyncio
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how late a periodic sleep wakes up.
+
+    Lag is time the loop spent running other callbacks (or blocked in
+    synchronous code) past the moment the sleep was due.
+    """
+    interval: float = 0.05
+    samples: Deque[float] = deque(maxlen=10000)
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls, interval_ms: float = 50):
+        if cls._task is None:
+            cls.interval = interval_ms / 1000
+            cls._task = asyncio.create_task(cls._run())
+            logger.info(f"Event-loop lag monitor sampling every {interval_ms:g}ms")
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + cls.interval
+            await asyncio.sleep(cls.interval)
+            cls.samples.append(max(0.0, loop.time() - due))
+
+    @classmethod
+    def snapshot(cls, reset: bool = False) -> dict:
+        """Lag percentiles in ms over the samples since the last reset"""
+        values = np.array(cls.samples) * 1000
+        if reset:
+            cls.samples.clear()
+        if not len(values):
+            return {"enabled": cls._task is not None, "samples": 0}
+        return {
+            "enabled": cls._task is not None,
+            "samples": len(values),
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p99_ms": round(float(np.percentile(values, 99)), 2),
+            "max_ms": round(float(values.max()), 2)
+        }
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
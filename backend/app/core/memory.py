@@ -0,0 +1,32 @@
+from typing import Dict, Optional, Union
+import os
+
+# smaps_rollup fields reported, in kB
+_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb"
+}
+
+def process_memory(pid: Union[int, str] = "self") -> Optional[Dict[str, float]]:
+    """RSS/PSS breakdown of a process in MiB from /proc, or None if unavailable.
+
+    PSS divides each shared page between the processes mapping it, so the
+    sum of worker PSS is the real footprint of a pre-fork deployment while
+    RSS counts shared model and index pages once per worker.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    usage = {"pid": os.getpid() if pid == "self" else int(pid)}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in _FIELDS:
+            usage[_FIELDS[name]] = round(int(rest.split()[0]) / 1024, 1)
+    return usage
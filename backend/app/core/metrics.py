@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily
+
+from app.core.tracing import Span, start_span
+
+# Seconds; spans cache hits (sub-ms) to LLM calls (tens of seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "medisearch_stage_seconds",
+    "Time spent in each search pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+AGENT_SECONDS = Histogram(
+    "medisearch_validator_agent_seconds",
+    "Time spent in each validator agent (cache hits included)",
+    ["agent"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("medisearch_llm_tokens_total", "Tokens reported by the LLM API", ["kind"])
+ERRORS = Counter("medisearch_errors_total", "Errors by component", ["component"])
+
+# Stage timings of the request being served, for its Server-Timing header
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+def record_timing(name: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+@contextmanager
+def collect_timings() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the (stage, seconds) pairs recorded in this context, in order"""
+    timings: List[Tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage measured by the caller, e.g. summed over several rounds"""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    record_timing(stage, seconds)
+
+@contextmanager
+def timed(stage: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Observe a pipeline stage in the histogram, the request's Server-Timing and its trace"""
+    start = time.perf_counter()
+    try:
+        with start_span(stage, **attributes) as span:
+            yield span
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+@contextmanager
+def timed_agent(agent: str) -> Iterator[Optional[Span]]:
+    start = time.perf_counter()
+    try:
+        with start_span(f"agent.{agent}") as span:
+            yield span
+    finally:
+        seconds = time.perf_counter() - start
+        AGENT_SECONDS.labels(agent).observe(seconds)
+        record_timing(agent, seconds)
+
+class CacheStatsCollector:
+    """Exports the caches' own hit/miss counters at scrape time"""
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("medisearch_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("medisearch_cache_misses", "Cache misses", labels=["cache"])
+        for name, stats in list(self.sources.items()):
+            values = stats()
+            hits.add_metric([name], values.get("hits", 0))
+            misses.add_metric([name], values.get("misses", 0))
+        yield hits
+        yield misses
+
+_cache_collector = CacheStatsCollector()
+REGISTRY.register(_cache_collector)
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]):
+    """Export a cache's `stats()` hits/misses as medisearch_cache_* counters"""
+    _cache_collector.sources[name] = stats
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type.
+
+    With PROMETHEUS_MULTIPROC_DIR set (pre-fork workers), histograms and
+    counters are aggregated across workers from the shared directory;
+    cache counters are per process and only exported without it.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a `Server-Timing` header with the request's stage breakdown.
+
+    Stages recorded with `timed` while the request is handled are summed
+    by name, in first-seen order, followed by the total. Streaming
+    responses send headers first, so they carry only the stages finished
+    before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_timings() as timings:
+            start = time.perf_counter()
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    header = _server_timing_header(timings, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+def _server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    durations: Dict[str, float] = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+    durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items())
@@ -0,0 +1,236 @@
+"""Lightweight request tracing.
+
+Spans nest through a contextvar, so a span opened anywhere in the
+request's task (or in tasks it creates) becomes a child of the enclosing
+one. Code on executor threads does not see the context: time those
+stages from the awaiting coroutine. W3C `traceparent` headers join
+incoming traces and are injected into outgoing LLM requests.
+
+Finished spans go to the exporter named by TRACING_EXPORTER: "jsonl"
+(one JSON object per line in TRACING_JSONL_PATH), "log", or the dotted
+path of any class with `export(span)` and `close()`. Unset, tracing is
+off and spans cost a contextvar lookup.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import functools
+import importlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "sampled",
+        "attributes", "status", "error", "start_time", "_start", "duration"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+class JsonlSpanExporter:
+    """Appends finished spans to a local JSONL file; works offline"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", buffering=1)
+        logger.info(f"Exporting trace spans to {self.path}")
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class LoggingSpanExporter:
+    """Logs each finished span as one line"""
+
+    def export(self, span: Span):
+        logger.info(
+            f"span {span.name} {span.duration * 1000:.1f}ms trace={span.trace_id} "
+            f"status={span.status} {json.dumps(span.attributes, default=str)}"
+        )
+
+    def close(self):
+        pass
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_exporter: Optional[Any] = None
+_exporter_loaded = False
+
+def build_exporter(name: Optional[str]):
+    if not name:
+        return None
+    if name == "jsonl":
+        return JsonlSpanExporter(settings.TRACING_JSONL_PATH)
+    if name == "log":
+        return LoggingSpanExporter()
+    module_name, _, class_name = name.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+def get_exporter():
+    """The configured span exporter, or None when tracing is off"""
+    global _exporter, _exporter_loaded
+    if not _exporter_loaded:
+        _exporter = build_exporter(settings.TRACING_EXPORTER)
+        _exporter_loaded = True
+    return _exporter
+
+def close_exporter():
+    global _exporter, _exporter_loaded
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = None
+    _exporter_loaded = False
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def set_attributes(**attributes: Any):
+    """Annotate the current span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C traceparent header"""
+    match = TRACEPARENT.match((header or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+@contextmanager
+def start_span(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open a span as a child of the current one (or of `traceparent`).
+
+    Yields None when tracing is off.
+    """
+    if get_exporter() is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    remote = parse_traceparent(traceparent) if parent is None else None
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, parent.sampled)
+    elif remote is not None:
+        span = Span(name, remote[0], remote[1], remote[2])
+    else:
+        trace_id = random.getrandbits(128).to_bytes(16, "big").hex()
+        span = Span(name, trace_id, None, random.random() < settings.TRACING_SAMPLE_RATE)
+    span.attributes.update(attributes)
+
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.duration = time.perf_counter() - span._start
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Finalized from another context (an abandoned async generator)
+            pass
+        if span.sampled:
+            try:
+                _exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span export failed: {e}")
+
+def traced(name: str) -> Callable:
+    """Decorator: run an async function inside a span"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with start_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def inject_traceparent(headers) -> None:
+    """Add the current span's traceparent to outgoing request headers"""
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of each HTTP request.
+
+    Joins the caller's trace when a valid `traceparent` header is sent and
+    returns the trace id in `x-trace-id`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or get_exporter() is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        name = f"{scope['method']} {scope['path']}"
+        with start_span(name, traceparent, **{"http.method": scope["method"], "http.path": scope["path"]}) as span:
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-trace-id", span.trace_id.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
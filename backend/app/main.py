@@ -1,9 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import api_router
 from app.core.config import settings
+from app.core.loop_lag import LoopLagMonitor
+from app.core.memory import process_memory
+from app.core.metrics import ServerTimingMiddleware, render_metrics
+from app.core.tracing import TracingMiddleware, close_exporter
 from app.services.database.mongodb import MongoDB
+from app.services.llm.groq_client import close_groq_client
+from app.services.cache.response_cache import close_response_cache
+from app.services.rag.pipeline_manager import RAGPipelineManager
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +41,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(TracingMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -42,9 +55,35 @@ async def root():
         "message": "MediSearch API",
         "version": settings.APP_VERSION,
         "docs": "/docs",
-        "health": "/api/v1/medical/health"
+        "health": "/api/v1/medical/health",
+        "ready": "/ready"
     }
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the RAG pipeline is loaded and warmed up"""
+    status = RAGPipelineManager.status()
+    return JSONResponse(status, status_code=200 if RAGPipelineManager.is_ready() else 503)
+
+if settings.MEMORY_ENDPOINT_ENABLED:
+    @app.get("/memory", include_in_schema=False)
+    async def memory():
+        """RSS/PSS of the worker serving this request"""
+        return process_memory() or {"pid": os.getpid()}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics"""
+        body, content_type = render_metrics()
+        return Response(body, media_type=content_type)
+
+if settings.LOOP_LAG_MONITOR:
+    @app.get("/loop-lag", include_in_schema=False)
+    async def loop_lag(reset: bool = False):
+        """Event-loop lag of the worker serving this request"""
+        return LoopLagMonitor.snapshot(reset=reset)
+
 @app.on_event("startup")
 async def startup_event():
     """Application startup"""
@@ -59,12 +98,24 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
         logger.warning("Application starting without MongoDB connection")
+    
+    # Load models and indexes now rather than on the first search
+    if settings.PIPELINE_EAGER_LOAD:
+        RAGPipelineManager.start()
+    
+    if settings.LOOP_LAG_MONITOR:
+        LoopLagMonitor.start(settings.LOOP_LAG_INTERVAL_MS)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown"""
     logger.info("Shutting down MediSearch API")
     await MongoDB.close_db()
+    await close_groq_client()
+    await close_response_cache()
+    await RAGPipelineManager.close()
+    await LoopLagMonitor.stop()
+    close_exporter()
 
 if __name__ == "__main__":
     import uvicorn
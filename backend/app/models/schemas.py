@@ -44,6 +44,12 @@ class SourceType(str, Enum):
     CLINICAL_TRIAL = "clinical_trial"
     ALL = "all"
 
+class ValidationTier(str, Enum):
+    NONE = "none"
+    HEURISTIC = "heuristic"
+    LLM = "llm"
+    AUTO = "auto"  # Heuristic verdict, plus the LLM verdict if it arrives within the budget
+
 class DateRange(BaseModel):
     start_date: Optional[str] = None  # YYYY-MM-DD or YYYY
     end_date: Optional[str] = None
@@ -59,6 +65,8 @@ class SearchRequest(BaseModel):
     query: str = Field(..., min_length=3, max_length=500, description="Medical search query")
     top_k: int = Field(default=10, ge=1, le=50, description="Number of results")
     filters: Optional[SearchFilters] = None
+    validation: ValidationTier = Field(default=ValidationTier.HEURISTIC, description="Answer validation tier")
+    validation_budget_ms: int = Field(default=1500, ge=0, le=60000, description="LLM validation budget in auto mode")
 
 class SourceEvidence(BaseModel):
     paper_id: str
@@ -67,6 +75,8 @@ class SourceEvidence(BaseModel):
     chunk_text: str
     source: str
     metadata: Dict[str, Any] = {}
+    # Full chunk text for context building; never serialized
+    context_text: Optional[str] = Field(default=None, exclude=True)
 
 class ValidationScore(BaseModel):
     confidence: float = Field(..., ge=0.0, le=1.0)
@@ -95,7 +105,9 @@ class SearchResponse(BaseModel):
     query: str
     answer: str
     sources: List[SourceEvidence]
-    validation: MultiAgentValidation
+    validation: Optional[MultiAgentValidation] = None
+    validation_tier: Optional[ValidationTier] = None  # Tier that produced `validation`
+    llm_validation: Optional[MultiAgentValidation] = None  # Auto tier: LLM verdict that arrived within the budget
     processing_time_ms: float
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     search_id: Optional[str] = None  # For saved searches
@@ -108,7 +120,7 @@ class SearchHistoryItem(BaseModel):
     query: str
     answer: str
     sources_count: int
-    overall_confidence: float
+    overall_confidence: Optional[float] = None
     filters: Optional[SearchFilters] = None
     created_at: datetime
 
@@ -125,7 +137,7 @@ class ComparisonResult(BaseModel):
     search_id: str
     query: str
     answer: str
-    overall_confidence: float
+    overall_confidence: Optional[float] = None
     sources_count: int
 
 class CompareResponse(BaseModel):
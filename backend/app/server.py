@@ -0,0 +1,166 @@
+"""Pre-fork server: load the search pipeline once, then fork uvicorn workers.
+
+    python -m app.server --workers 4
+
+The master process builds the RAG pipeline (PubMedBERT weights in shared
+memory, memory-mapped document store and BM25 index, facet arrays) and
+binds the listening socket; forked workers inherit both, so model and index
+pages are shared read-only instead of loaded once per worker. The master
+does not run the model itself: workers warm up after fork, and /ready
+reports each worker as ready once it has.
+
+Prometheus metrics are aggregated across workers: each worker writes its
+counters and histograms to PROMETHEUS_MULTIPROC_DIR (PREFORK_METRICS_DIR
+unless set), and /metrics on any worker reports the sum. Cache hit/miss
+counters are kept per process and are not exported in this mode.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.memory import process_memory
+
+logger = logging.getLogger("app.server")
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def setup_multiprocess_metrics() -> Path:
+    """Point prometheus_client at a fresh directory shared by all workers.
+
+    Must run before prometheus_client is imported: it picks its value
+    storage at import time.
+    """
+    path = Path(os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PREFORK_METRICS_DIR))
+    path.mkdir(parents=True, exist_ok=True)
+    # Files left by an earlier run would be added to this run's totals
+    for stale in path.glob("*.db"):
+        stale.unlink()
+    return path
+
+def run_worker(app, sock: socket.socket, workers: int):
+    """Serve the app on the inherited socket (runs in the forked child)"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Split the cores between workers instead of every worker using all of them
+    import torch
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    config = uvicorn.Config(app, log_config=None, timeout_graceful_shutdown=30)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def spawn(app, sock: socket.socket, workers: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, workers)
+        except Exception:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    logger.info(f"Started worker {pid}")
+    return pid
+
+def report_memory(children: set):
+    master = process_memory()
+    if master is None:
+        return
+    total_pss = master.get("pss_mb", 0.0)
+    logger.info(f"Memory master {master['pid']}: {master}")
+    for pid in sorted(children):
+        usage = process_memory(pid)
+        if usage is None:
+            continue
+        total_pss += usage.get("pss_mb", 0.0)
+        logger.info(f"Memory worker {pid}: {usage}")
+    logger.info(f"Memory total PSS: {total_pss:.1f} MiB across {len(children)} workers")
+
+def serve(host: str, port: int, workers: int):
+    metrics_dir = setup_multiprocess_metrics()
+    logger.info(f"Aggregating worker metrics in {metrics_dir}")
+
+    # Imported after the metrics setup, which must precede prometheus_client
+    from prometheus_client import multiprocess
+    from app.main import app
+    from app.services.rag.pipeline_manager import RAGPipelineManager
+    from app.services.rag.rag_pipeline import RAGPipeline
+
+    logger.info(f"Pre-fork master {os.getpid()}: loading search pipeline")
+    pipeline = RAGPipeline()
+    pipeline.prepare_for_fork()
+    RAGPipelineManager.preload(pipeline)
+
+    sock = bind_socket(host, port)
+    logger.info(f"Listening on {host}:{port} with {workers} workers")
+
+    # Move everything allocated so far out of the collector's reach: a GC
+    # pass in a worker would otherwise write to (and copy) shared pages
+    gc.collect()
+    gc.freeze()
+
+    children = {spawn(app, sock, workers) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + settings.PREFORK_MEMORY_REPORT_SECONDS
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            children.discard(pid)
+            # Its counters stay in the totals; only its live gauges are dropped
+            multiprocess.mark_process_dead(pid)
+            if not stopping:
+                logger.warning(f"Worker {pid} exited with status {status}; restarting")
+                children.add(spawn(app, sock, workers))
+            continue
+
+        if settings.PREFORK_MEMORY_REPORT_SECONDS and time.monotonic() >= next_report:
+            report_memory(children)
+            next_report = time.monotonic() + settings.PREFORK_MEMORY_REPORT_SECONDS
+        time.sleep(0.5)
+
+    sock.close()
+    pipeline.close()
+    logger.info("Pre-fork master stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MediSearch with pre-forked workers")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.PREFORK_WORKERS)
+    args = parser.parse_args()
+    serve(args.host, args.port, max(1, args.workers))
+
+if __name__ == "__main__":
+    main()
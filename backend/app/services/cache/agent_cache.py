@@ -0,0 +1,74 @@
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Type, Union
+import functools
+import hashlib
+import json
+import logging
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+from app.core.tracing import set_attributes
+from app.services.cache.tiered_cache import TieredCache, build_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+# Agents only see the answer and the titles of the top sources
+PROMPT_SOURCES = 5
+PROMPT_TITLE_CHARS = 80
+
+_agent_cache: Optional[TieredCache] = None
+
+def get_agent_cache() -> TieredCache:
+    """Get the process-wide cache of validation agent results"""
+    global _agent_cache
+    if _agent_cache is None:
+        _agent_cache = build_tiered_cache(
+            max_entries=settings.AGENT_CACHE_SIZE,
+            ttl_seconds=settings.AGENT_CACHE_TTL_SECONDS,
+            disk_path=settings.AGENT_CACHE_PATH
+        )
+        register_cache("validation_agents", _agent_cache.stats)
+    return _agent_cache
+
+def prompt_titles(sources: List[dict]) -> List[str]:
+    """Source titles exactly as they appear in an agent prompt"""
+    return [s.get('title', 'Unknown')[:PROMPT_TITLE_CHARS] for s in sources[:PROMPT_SOURCES]]
+
+def agent_cache_key(agent: str, prompt_version: int, answer: str, sources: List[dict]) -> str:
+    """Content address of one agent evaluation: agent, prompt version, model and inputs"""
+    inputs = json.dumps([answer, prompt_titles(sources)], separators=(",", ":"))
+    digest = hashlib.sha256(inputs.encode("utf-8")).hexdigest()
+    return f"{agent}:v{prompt_version}:{settings.GROQ_MODEL}:{digest}"
+
+def memoize_validation(result_model: Union[Type[BaseModel], Tuple[Type[BaseModel], ...]]):
+    """Cache an agent's `validate(answer, sources)` by content.
+
+    The agent class provides `name` and `PROMPT_VERSION`; bump the version
+    whenever its prompt or parsing changes. A tuple of models caches an
+    agent that returns one result per model. Results flagged
+    `validation_error` are returned but never cached, nor are exceptions.
+    """
+    models = result_model if isinstance(result_model, tuple) else (result_model,)
+
+    def decorator(validate: Callable[..., Awaitable[Any]]):
+        @functools.wraps(validate)
+        async def wrapper(self, answer: str, sources: List[dict]) -> Any:
+            if not settings.AGENT_CACHE_ENABLED:
+                return await validate(self, answer, sources)
+
+            cache = get_agent_cache()
+            key = agent_cache_key(self.name, self.PROMPT_VERSION, answer, sources)
+            cached: Optional[List[dict]] = cache.get(key)
+            set_attributes(cached=cached is not None)
+            if cached is not None:
+                logger.info(f"{self.name}: cached validation")
+                results = tuple(model(**data) for model, data in zip(models, cached))
+                return results if isinstance(result_model, tuple) else results[0]
+
+            result = await validate(self, answer, sources)
+            results = result if isinstance(result_model, tuple) else (result,)
+            if all("validation_error" not in r.flags for r in results):
+                cache.set(key, [r.dict() for r in results])
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# SQLite connections must not cross fork(): forked workers open their own
+_open_caches: "weakref.WeakSet[DiskCache]" = weakref.WeakSet()
+
+class DiskCache:
+    """Persistent key/value cache in a local SQLite file.
+    
+    Values are pickled, so only point it at files this service writes.
+    Entries survive restarts and are shared by workers on the same host.
+    """
+    
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._connect()
+        _open_caches.add(self)
+        self.hits = 0
+        self.misses = 0
+        logger.info(f"Disk cache opened at {self.path}")
+    
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (row[1] is None or row[1] > time.time()):
+                self.hits += 1
+                return pickle.loads(row[0])
+            if row is not None:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return default
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at, now)
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+def _reconnect_after_fork():
+    for cache in list(_open_caches):
+        cache._connect()
+
+os.register_at_fork(after_in_child=_reconnect_after_fork)
@@ -0,0 +1,226 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+from app.services.cache.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class MemoryResponseBackend:
+    """In-process backend: a bounded LRU/TTL cache local to one worker"""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.cache = TTLCache(max_entries, ttl_seconds)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        self.cache.set(key, value, ttl_seconds)
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self.cache.stats()}
+
+class SharedResponseBackend:
+    """Backend shared between workers through a Redis-compatible async client.
+
+    Any client with `get(key)` and `set(key, value, ex=seconds)` works, so
+    tests can pass an in-memory stand-in instead of a Redis server.
+    """
+
+    def __init__(self, client: Any, prefix: str = "medisearch:response:", ttl_seconds: Optional[float] = None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, ttl_seconds: Optional[float] = None) -> "SharedResponseBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "RESPONSE_CACHE_URL requires the redis package (pip install redis)"
+            ) from e
+        return cls(redis.from_url(url), ttl_seconds=ttl_seconds)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.client.get(self.prefix + key)
+        except Exception as e:
+            # A cache outage degrades to recomputing, never to a failed search
+            self.errors += 1
+            logger.warning(f"Shared response cache read failed: {e}")
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        try:
+            await self.client.set(
+                self.prefix + key,
+                json.dumps(value),
+                ex=int(ttl) if ttl else None
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared response cache write failed: {e}")
+
+    async def aclose(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": "shared",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class ResponseCache:
+    """Cache of complete search results with single-flight coalescing.
+
+    Values must be JSON-serializable. Concurrent misses on the same key
+    share one in-flight computation instead of each running it; failures
+    are propagated to every waiter and never cached. Coalescing is per
+    process, the backend may be shared.
+    """
+
+    def __init__(self, backend: Any, ttl_seconds: Optional[float] = None):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any], namespace: Dict[str, Any]) -> str:
+        """Canonical hash of a request payload within a namespace (e.g. corpus version)"""
+        canonical = json.dumps(
+            {"namespace": namespace, "request": payload},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """Cached value for key, computing it at most once per process at a time.
+
+        Values rejected by `cacheable` are still shared with concurrent
+        waiters but not stored.
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            # Shield so a cancelled waiter does not cancel the shared computation
+            return await asyncio.shield(in_flight)
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        # Another request may have started computing while we read the backend
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        # Run as its own task so a disconnecting first caller does not
+        # cancel the computation the other waiters are sharing
+        task = asyncio.get_running_loop().create_task(self._compute_and_store(key, compute, cacheable))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]]
+    ) -> Dict[str, Any]:
+        value = await compute()
+        if cacheable is None or cacheable(value):
+            await self.backend.set(key, value, self.ttl_seconds)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        # Retrieve the outcome so a failure whose waiters all left is not reported as unhandled
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Response computation failed: {task.exception()}")
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "hit_rate": self.hits / total if total else 0.0,
+            "backend": self.backend.stats()
+        }
+
+def build_response_cache(
+    max_entries: int,
+    ttl_seconds: Optional[float] = None,
+    shared_url: Optional[str] = None
+) -> ResponseCache:
+    """Build a ResponseCache, using the shared backend when a URL is configured"""
+    if shared_url:
+        backend = SharedResponseBackend.from_url(shared_url, ttl_seconds)
+    else:
+        backend = MemoryResponseBackend(max_entries, ttl_seconds)
+    return ResponseCache(backend, ttl_seconds)
+
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the process-wide search response cache, or None when disabled"""
+    global _response_cache
+    if _response_cache is None and settings.RESPONSE_CACHE_ENABLED:
+        _response_cache = build_response_cache(
+            max_entries=settings.RESPONSE_CACHE_SIZE,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+            shared_url=settings.RESPONSE_CACHE_URL
+        )
+        register_cache("responses", _response_cache.stats)
+    return _response_cache
+
+async def close_response_cache():
+    """Close the shared response cache backend if it was created"""
+    global _response_cache
+    if _response_cache is not None:
+        await _response_cache.aclose()
+        _response_cache = None
+        logger.info("Response cache closed")
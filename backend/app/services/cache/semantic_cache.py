@@ -0,0 +1,175 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import itertools
+import logging
+import threading
+import time
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """Answers of past queries, served to paraphrases by embedding similarity.
+
+    Entries hold a unit-normalized query embedding in a preallocated matrix,
+    so a lookup is one matrix-vector product over at most max_entries rows.
+    An entry is only eligible when its scope (filters, top_k, models) is
+    identical and its corpus version is current; the most similar eligible
+    entry is served if it clears the cosine threshold. The least recently
+    used entry is replaced when full.
+    """
+
+    def __init__(self, max_entries: int, threshold: float, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._matrix: Optional[np.ndarray] = None
+        self._live = np.zeros(self.max_entries, dtype=bool)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._ids = itertools.count(1)
+        self._version: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._hit_similarity = 0.0
+
+    def lookup(self, embedding: List[float], scope: str, version: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(cached value, similarity) of the closest eligible entry, or None"""
+        query = _normalize(embedding)
+        with self._lock:
+            self._retain_version(version)
+            if self._matrix is None or query.shape[0] != self._matrix.shape[1] or not self._live.any():
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ query
+            similarities[~self._live] = -np.inf
+            now = time.monotonic()
+            for slot in np.argsort(-similarities):
+                similarity = float(similarities[slot])
+                if similarity < self.threshold:
+                    break
+                entry = self._entries[slot]
+                if entry["expires_at"] is not None and entry["expires_at"] <= now:
+                    self._drop(slot)
+                    continue
+                if entry["scope"] != scope:
+                    continue
+                self._last_used[slot] = now
+                self.hits += 1
+                self._hit_similarity += similarity
+                return entry["value"], similarity
+
+            self.misses += 1
+            return None
+
+    def add(
+        self,
+        embedding: List[float],
+        scope: str,
+        version: Any,
+        value: Dict[str, Any],
+        paper_ids: Iterable[str] = ()
+    ) -> int:
+        """Store a value; paper_ids are the sources it was built from (for invalidation)"""
+        vector = _normalize(embedding)
+        with self._lock:
+            self._retain_version(version)
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._live[:] = False
+                self._entries = [None] * self.max_entries
+
+            free = np.flatnonzero(~self._live)
+            slot = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+            now = time.monotonic()
+            entry_id = next(self._ids)
+            self._matrix[slot] = vector
+            self._live[slot] = True
+            self._last_used[slot] = now
+            self._entries[slot] = {
+                "id": entry_id,
+                "scope": scope,
+                "value": value,
+                "paper_ids": set(paper_ids),
+                "expires_at": now + self.ttl_seconds if self.ttl_seconds else None
+            }
+            return entry_id
+
+    def invalidate(self, entry_id: int) -> bool:
+        """Drop one entry by id"""
+        with self._lock:
+            for slot in np.flatnonzero(self._live):
+                if self._entries[slot]["id"] == entry_id:
+                    self._drop(slot)
+                    return True
+            return False
+
+    def invalidate_papers(self, paper_ids: Iterable[str]) -> int:
+        """Drop every entry whose sources include one of the papers"""
+        changed = set(paper_ids)
+        dropped = 0
+        with self._lock:
+            for slot in np.flatnonzero(self._live):
+                if self._entries[slot]["paper_ids"] & changed:
+                    self._drop(slot)
+                    dropped += 1
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._live[:] = False
+            self._entries = [None] * self.max_entries
+
+    def _retain_version(self, version: Any):
+        """Drop everything cached against an older corpus (lock held)"""
+        if version != self._version:
+            if self._live.any():
+                logger.info(f"Corpus changed ({self._version} -> {version}); clearing semantic cache")
+                for slot in np.flatnonzero(self._live):
+                    self._drop(slot)
+            self._version = version
+
+    def _drop(self, slot: int):
+        self._live[slot] = False
+        self._entries[slot] = None
+        self.invalidations += 1
+
+    def __len__(self) -> int:
+        return int(self._live.sum())
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+            "avg_hit_similarity": self._hit_similarity / self.hits if self.hits else None
+        }
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+_semantic_cache: Optional[SemanticCache] = None
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the process-wide semantic answer cache, or None when disabled"""
+    global _semantic_cache
+    if _semantic_cache is None and settings.SEMANTIC_CACHE_ENABLED:
+        _semantic_cache = SemanticCache(
+            max_entries=settings.SEMANTIC_CACHE_SIZE,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS
+        )
+        register_cache("semantic_answers", _semantic_cache.stats)
+    return _semantic_cache
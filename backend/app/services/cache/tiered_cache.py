@@ -0,0 +1,84 @@
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional
+import asyncio
+from app.services.cache.ttl_cache import TTLCache
+from app.services.cache.disk_cache import DiskCache
+
+_MISSING = object()
+
+class TieredCache:
+    """In-memory LRU/TTL cache backed by an optional persistent tier"""
+    
+    def __init__(self, memory: TTLCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+    
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+    
+    async def aget(self, key: str, executor: Optional[Executor] = None, default: Any = None) -> Any:
+        """get() for async callers: the disk tier is read on `executor`, not the event loop"""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(executor, self.disk.get, key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+    
+    async def aset(self, key: str, value: Any, executor: Optional[Executor] = None):
+        """set() for async callers: the disk tier is written on `executor`, not the event loop"""
+        self.memory.set(key, value)
+        if self.disk is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(executor, self.disk.set, key, value)
+    
+    def delete(self, key: str) -> bool:
+        deleted = self.memory.delete(key)
+        if self.disk is not None:
+            deleted = self.disk.delete(key) or deleted
+        return deleted
+    
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        hits = memory["hits"] + (disk["hits"] if disk else 0)
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory": memory,
+            "disk": disk
+        }
+
+def build_tiered_cache(
+    max_entries: int,
+    ttl_seconds: Optional[float] = None,
+    disk_path: Optional[str] = None,
+    disk_max_entries: Optional[int] = None
+) -> TieredCache:
+    """Build a TieredCache, adding the disk tier only when a path is configured"""
+    disk = DiskCache(disk_path, ttl_seconds, disk_max_entries) if disk_path else None
+    return TieredCache(TTLCache(max_entries, ttl_seconds), disk)
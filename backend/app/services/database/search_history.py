@@ -4,6 +4,7 @@ from bson import ObjectId
 from app.services.database.mongodb import MongoDB, SEARCH_HISTORY_COLLECTION
 from app.models.schemas import SearchHistoryItem, SearchResponse, SearchFilters
 from app.core.config import settings
+from app.core.tracing import traced
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +12,7 @@ logger = logging.getLogger(__name__)
 class SearchHistoryService:
     
     @staticmethod
+    @traced("mongodb.save_search")
     async def save_search(user_id: str, search_response: SearchResponse, filters: Optional[SearchFilters] = None) -> str:
         """Save search to history"""
         collection = MongoDB.get_collection(SEARCH_HISTORY_COLLECTION)
@@ -20,9 +22,11 @@ class SearchHistoryService:
             "query": search_response.query,
             "answer": search_response.answer,
             "sources": [s.dict() for s in search_response.sources],
-            "validation": search_response.validation.dict(),
+            "validation": search_response.validation.dict() if search_response.validation else None,
             "sources_count": len(search_response.sources),
-            "overall_confidence": search_response.validation.overall_confidence,
+            "overall_confidence": (
+                search_response.validation.overall_confidence if search_response.validation else None
+            ),
             "filters": filters.dict() if filters else None,
             "processing_time_ms": search_response.processing_time_ms,
             "created_at": search_response.timestamp
@@ -38,6 +42,7 @@ class SearchHistoryService:
         return search_id
     
     @staticmethod
+    @traced("mongodb.get_user_history")
     async def get_user_history(user_id: str, limit: int = 20, skip: int = 0) -> List[SearchHistoryItem]:
         """Get user's search history"""
         collection = MongoDB.get_collection(SEARCH_HISTORY_COLLECTION)
@@ -54,7 +59,7 @@ class SearchHistoryService:
                 query=doc["query"],
                 answer=doc["answer"],
                 sources_count=doc["sources_count"],
-                overall_confidence=doc["overall_confidence"],
+                overall_confidence=doc.get("overall_confidence"),
                 filters=SearchFilters(**doc["filters"]) if doc.get("filters") else None,
                 created_at=doc["created_at"]
             ))
@@ -62,6 +67,7 @@ class SearchHistoryService:
         return searches
     
     @staticmethod
+    @traced("mongodb.get_search_by_id")
     async def get_search_by_id(search_id: str, user_id: str) -> Optional[dict]:
         """Get specific search by ID"""
         collection = MongoDB.get_collection(SEARCH_HISTORY_COLLECTION)
@@ -77,6 +83,7 @@ class SearchHistoryService:
             return None
     
     @staticmethod
+    @traced("mongodb.delete_search")
     async def delete_search(search_id: str, user_id: str) -> bool:
         """Delete a search from history"""
         collection = MongoDB.get_collection(SEARCH_HISTORY_COLLECTION)
@@ -92,6 +99,7 @@ class SearchHistoryService:
             return False
     
     @staticmethod
+    @traced("mongodb.get_history_count")
     async def get_history_count(user_id: str) -> int:
         """Get total count of user's searches"""
         collection = MongoDB.get_collection(SEARCH_HISTORY_COLLECTION)
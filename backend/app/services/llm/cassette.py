@@ -0,0 +1,120 @@
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("record", "replay")
+REPLAY_LATENCIES = ("recorded", "zero")
+
+class CassetteMiss(LookupError):
+    """Replay mode was asked for a completion that was never recorded"""
+
+class Cassette:
+    """Content-addressed record/replay store for LLM completions.
+
+    Each completion is one JSON file named after the sha256 of its request
+    (model, messages, sampling params, streaming or not), so identical
+    requests share a recording and recordings can be diffed and committed.
+    Record mode calls the API and stores the reply with its observed
+    latency (and per-delta timing for streams); replay mode serves stored
+    replies with that latency, or none, and never touches the network.
+    """
+
+    def __init__(self, path: str, mode: str, latency: str = "recorded"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {CASSETTE_MODES}")
+        if latency not in REPLAY_LATENCIES:
+            raise ValueError(f"Unknown replay latency {latency!r}; expected one of {REPLAY_LATENCIES}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        logger.info(f"LLM cassette in {mode} mode at {self.path}")
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def _load(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        key = self.make_key(request)
+        try:
+            with open(self._file(key)) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            raise CassetteMiss(f"No recorded completion {key[:12]} in {self.path}") from None
+        self.hits += 1
+        return entry
+
+    def _store(self, request: Dict[str, Any], entry: Dict[str, Any]):
+        key = self.make_key(request)
+        file = self._file(key)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"request": request, "recorded_at": datetime.now(timezone.utc).isoformat(), **entry}
+        # Write-then-rename so concurrent workers never read a partial file
+        tmp = file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(entry, indent=2, ensure_ascii=False))
+        os.replace(tmp, file)
+        self.recorded += 1
+
+    async def complete(self, request: Dict[str, Any], call: Callable[[], Awaitable[str]]) -> str:
+        if self.mode == "replay":
+            entry = self._load(request)
+            if self.latency == "recorded":
+                await asyncio.sleep(entry["latency_s"])
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = await call()
+        self._store(request, {"latency_s": round(time.perf_counter() - start, 4), "response": response})
+        return response
+
+    async def stream(self, request: Dict[str, Any], call: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        if self.mode == "replay":
+            entry = self._load(request)
+            start = time.perf_counter()
+            for offset, delta in entry["chunks"]:
+                if self.latency == "recorded":
+                    # Sleep to the delta's original offset from the request
+                    await asyncio.sleep(max(0.0, offset - (time.perf_counter() - start)))
+                yield delta
+            return
+
+        start = time.perf_counter()
+        chunks: List[list] = []
+        async for delta in call():
+            chunks.append([round(time.perf_counter() - start, 4), delta])
+            yield delta
+        # Only complete streams are recorded
+        self._store(request, {"latency_s": round(time.perf_counter() - start, 4), "chunks": chunks})
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "path": str(self.path),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded
+        }
+
+def build_cassette() -> Optional[Cassette]:
+    """Cassette configured by LLM_CASSETTE_MODE, or None for live calls"""
+    if not settings.LLM_CASSETTE_MODE:
+        return None
+    return Cassette(settings.LLM_CASSETTE_PATH, settings.LLM_CASSETTE_MODE, settings.LLM_CASSETTE_LATENCY)
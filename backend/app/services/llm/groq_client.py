@@ -1,55 +1,168 @@
-from groq import Groq
-from typing import List, Dict, Optional
+from groq import AsyncGroq
+import httpx
+from typing import Any, List, Dict, Optional, AsyncIterator
 import logging
+import threading
 from tenacity import retry, stop_after_attempt, wait_exponential
 from app.core.config import settings
+from app.core.metrics import ERRORS, LLM_TOKENS
+from app.core.tracing import inject_traceparent, set_attributes, start_span
+from app.services.llm.cassette import build_cassette
 
 logger = logging.getLogger(__name__)
 
 class GroqClient:
-    """Client for Groq API with Llama 3.1"""
+    """Async client for Groq API with Llama 3.1"""
     
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        # One pooled HTTP/2 transport so concurrent completions multiplex
+        # over a few kept-alive connections instead of dialing per call
+        self.http_client = httpx.AsyncClient(
+            http2=settings.GROQ_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(settings.GROQ_TIMEOUT),
+            event_hooks={"request": [self._propagate_trace]}
+        )
+        self.client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL,
+            http_client=self.http_client
+        )
         self.model = settings.GROQ_MODEL
-        logger.info(f"Initialized Groq client with model: {self.model}")
+        # Record/replay of completions for reproducible offline runs
+        self.cassette = build_cassette()
+        logger.info(
+            f"Initialized Groq client with model: {self.model} "
+            f"(http2={settings.GROQ_HTTP2}, pool={settings.GROQ_MAX_CONNECTIONS})"
+        )
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
     async def generate(
         self,
         prompt: str,
         max_tokens: int = 512,
         temperature: float = 0.7,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        response_format: Optional[Dict[str, str]] = None
     ) -> str:
-        """Generate text using Groq API"""
+        """Generate text using Groq API
         
+        Pass response_format={"type": "json_object"} to force a JSON reply.
+        """
+        request = self._build_request(prompt, max_tokens, temperature, system_prompt, response_format)
+        with start_span("llm.generate", **self._span_attributes(request)):
+            if self.cassette is not None:
+                return await self.cassette.complete(request, lambda: self._complete(request))
+            return await self._complete(request)
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def _complete(self, request: Dict[str, Any]) -> str:
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+            response = await self.client.chat.completions.create(**request)
+            self._count_tokens(response.usage)
             
             return response.choices[0].message.content.strip()
             
         except Exception as e:
             logger.error(f"Groq generation error: {e}")
+            ERRORS.labels("llm").inc()
             raise
     
-    def health_check(self) -> bool:
+    async def generate_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream generated text deltas as Groq produces them"""
+        request = self._build_request(prompt, max_tokens, temperature, system_prompt, stream=True)
+        deltas = self._stream(request) if self.cassette is None else self.cassette.stream(
+            request, lambda: self._stream(request)
+        )
+        with start_span("llm.stream", **self._span_attributes(request)):
+            async for delta in deltas:
+                yield delta
+    
+    async def _stream(self, request: Dict[str, Any]) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(**request)
+            
+            async for chunk in stream:
+                # Usage arrives once, on the final chunk (under x_groq on Groq)
+                x_groq = getattr(chunk, "x_groq", None)
+                self._count_tokens(getattr(chunk, "usage", None) or getattr(x_groq, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+                    
+        except Exception as e:
+            logger.error(f"Groq streaming error: {e}")
+            ERRORS.labels("llm").inc()
+            raise
+    
+    @staticmethod
+    def _count_tokens(usage):
+        if usage is None:
+            return
+        LLM_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+        set_attributes(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+    
+    def _span_attributes(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": request["model"],
+            "max_tokens": request["max_tokens"],
+            "json_mode": "response_format" in request,
+            "cassette": self.cassette.mode if self.cassette is not None else None
+        }
+    
+    @staticmethod
+    async def _propagate_trace(request: httpx.Request):
+        inject_traceparent(request.headers)
+    
+    def _build_request(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        system_prompt: Optional[str],
+        response_format: Optional[Dict[str, str]] = None,
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """Chat completion parameters; also the cassette key"""
+        request = {
+            "model": self.model,
+            "messages": self._build_messages(prompt, system_prompt),
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if response_format:
+            request["response_format"] = response_format
+        if stream:
+            request["stream"] = True
+        return request
+    
+    def _build_messages(self, prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        """Build chat messages"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    async def health_check(self) -> bool:
         """Check if Groq API is accessible"""
         try:
-            self.client.chat.completions.create(
+            await self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": "test"}],
                 max_tokens=5
@@ -57,3 +170,29 @@ class GroqClient:
             return True
         except:
             return False
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.close()
+
+# Shared client (singleton pattern)
+_groq_client: Optional[GroqClient] = None
+# The pipeline is built on a worker thread while agents may ask from the loop
+_groq_client_lock = threading.Lock()
+
+def get_groq_client() -> GroqClient:
+    """Get the process-wide Groq client and its connection pool"""
+    global _groq_client
+    if _groq_client is None:
+        with _groq_client_lock:
+            if _groq_client is None:
+                _groq_client = GroqClient()
+    return _groq_client
+
+async def close_groq_client():
+    """Close the shared Groq client if it was created"""
+    global _groq_client
+    if _groq_client is not None:
+        await _groq_client.aclose()
+        _groq_client = None
+        logger.info("Groq client closed")
@@ -0,0 +1,53 @@
+from typing import Dict, List, NamedTuple, Tuple
+import math
+
+POOLING_MODES = ("max", "sum")
+
+class PaperHit(NamedTuple):
+    paper_id: str
+    score: float
+    chunks: List[Tuple[str, float]]  # (chunk id, fused score), best first
+
+def paper_id_of(doc_id: str) -> str:
+    """Chroma ids are `<paper>_chunk_<n>`"""
+    return doc_id.split('_chunk_')[0] if '_chunk_' in doc_id else doc_id
+
+def collapse_by_paper(
+    ranked: List[Tuple[str, float]],
+    chunks_per_paper: int = 1,
+    pooling: str = "max"
+) -> List[PaperHit]:
+    """Group ranked chunk hits by paper, best paper first.
+
+    A paper's score pools all of its chunk scores: "max" keeps the best
+    chunk's score, "sum" rewards papers matching in several chunks. Only
+    the best `chunks_per_paper` chunks of each paper are kept.
+    """
+    if pooling not in POOLING_MODES:
+        raise ValueError(f"Unknown pooling {pooling!r}; expected one of {POOLING_MODES}")
+
+    chunks: Dict[str, List[Tuple[str, float]]] = {}
+    pooled: Dict[str, float] = {}
+    for doc_id, score in ranked:
+        paper_id = paper_id_of(doc_id)
+        paper_chunks = chunks.setdefault(paper_id, [])
+        if pooling == "sum":
+            pooled[paper_id] = pooled.get(paper_id, 0.0) + score
+        else:
+            pooled[paper_id] = max(pooled.get(paper_id, score), score)
+        if len(paper_chunks) < chunks_per_paper:
+            # `ranked` is sorted, so the first chunks seen are the best
+            paper_chunks.append((doc_id, score))
+
+    # Stable sort: ties keep the order of each paper's best chunk
+    order = sorted(chunks, key=lambda paper_id: pooled[paper_id], reverse=True)
+    return [PaperHit(paper_id, pooled[paper_id], chunks[paper_id]) for paper_id in order]
+
+def next_candidate_count(fetched: int, papers_found: int, top_k: int, max_candidates: int) -> int:
+    """Candidates per branch for the next retrieval round.
+
+    Scales the last round by how many papers it yielded relative to the
+    `top_k` wanted (at least doubling, so each round makes progress).
+    """
+    wanted = math.ceil(fetched * top_k / max(papers_found, 1))
+    return min(max_candidates, max(2 * fetched, wanted))
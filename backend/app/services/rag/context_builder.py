@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional, Sequence
+import logging
+import math
+import re
+import threading
+import numpy as np
+
+from app.core.tracing import set_attributes
+from app.models.schemas import SourceEvidence
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9\[(])')
+WORD = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)*')
+
+# Too common in queries to say anything about a sentence
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their this to was
+were what which with does do how in vs versus among between effect effects patients study
+""".split())
+
+# Fallback when the LLM tokenizer cannot be loaded
+CHARS_PER_TOKEN = 4
+
+# Tie-breaker that keeps sources' leading sentences (in rank order) ahead of
+# unrelated ones when no sentence shares a term with the query
+POSITION_WEIGHT = 0.01
+
+class TokenCounter:
+    """Counts tokens with the answer model's own tokenizer"""
+
+    def __init__(self, tokenizer_name: Optional[str]):
+        self.tokenizer = None
+        # Fast tokenizers are not safe to call from several executor threads at once
+        self._lock = threading.Lock()
+        if tokenizer_name:
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+                logger.info(f"Context budget counted with {tokenizer_name} tokenizer")
+            except Exception as e:
+                logger.warning(
+                    f"Could not load tokenizer {tokenizer_name} ({e}); "
+                    f"approximating {CHARS_PER_TOKEN} characters per token"
+                )
+
+    def count(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        if self.tokenizer is None:
+            return [math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts]
+        with self._lock:
+            encoded = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+class ContextBuilder:
+    """Extractive, token-budgeted RAG context.
+
+    Every source chunk is split into sentences and each sentence is scored
+    by IDF-weighted overlap with the query terms (one sparse count matrix
+    for all sentences), discounted by the source's rank. The best sentences
+    are packed into a hard budget of LLM tokens and emitted per source, in
+    their original order, under the same `[Source N - title]` headers the
+    answer prompt cites.
+    """
+
+    def __init__(self, counter: TokenCounter):
+        self.counter = counter
+
+    def build(self, query: str, sources: List[SourceEvidence], max_tokens: int) -> str:
+        query_terms = list(dict.fromkeys(t for t in WORD.findall(query.lower()) if t not in STOPWORDS))
+
+        headers: List[str] = []
+        sentences: List[str] = []
+        owners: List[int] = []
+        positions: List[int] = []
+        for idx, source in enumerate(sources):
+            headers.append(f"[Source {idx + 1} - {source.title[:80]}]")
+            text = source.context_text or source.chunk_text
+            for position, sentence in enumerate(split_sentences(text)):
+                sentences.append(sentence)
+                owners.append(idx)
+                positions.append(position)
+        if not sentences:
+            return ""
+
+        scores = self._score(query_terms, sentences, np.array(owners), np.array(positions))
+        header_tokens = self.counter.count(headers)
+        # Leading space: sentences are joined with spaces inside a source block
+        sentence_tokens = self.counter.count([" " + s for s in sentences])
+
+        selected = self._pack(scores, owners, header_tokens, sentence_tokens, max_tokens)
+        context = self._render(headers, sentences, owners, selected)
+
+        # Joins can merge or split tokens at boundaries: enforce the budget on the real text
+        total = self.counter.count([context])[0]
+        while total > max_tokens and selected:
+            selected.remove(min(selected, key=lambda i: scores[i]))
+            context = self._render(headers, sentences, owners, selected)
+            total = self.counter.count([context])[0] if selected else 0
+
+        used_sources = len({owners[i] for i in selected})
+        set_attributes(
+            context_tokens=total, max_tokens=max_tokens, sentences=len(selected),
+            candidate_sentences=len(sentences), sources_used=used_sources
+        )
+        logger.info(
+            f"Built context: {total} tokens, {len(selected)}/{len(sentences)} sentences "
+            f"from {used_sources}/{len(sources)} sources"
+        )
+        return context
+
+    def _score(self, query_terms: List[str], sentences: List[str], owners: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Query-overlap score per sentence"""
+        num_sentences = len(sentences)
+        overlap = np.zeros(num_sentences)
+        if query_terms:
+            term_ids: Dict[str, int] = {term: i for i, term in enumerate(query_terms)}
+            rows: List[int] = []
+            cols: List[int] = []
+            for row, sentence in enumerate(sentences):
+                for word in WORD.findall(sentence.lower()):
+                    col = term_ids.get(word)
+                    if col is not None:
+                        rows.append(row)
+                        cols.append(col)
+            if rows:
+                counts = np.bincount(
+                    np.array(rows) * len(query_terms) + np.array(cols),
+                    minlength=num_sentences * len(query_terms)
+                ).reshape(num_sentences, len(query_terms))
+                present = counts > 0
+                document_frequency = present.sum(axis=0)
+                idf = np.log1p(num_sentences / (1 + document_frequency))
+                # Distinct query terms dominate; repeats add a little
+                overlap = present @ idf + 0.1 * (np.log1p(counts) @ idf)
+
+        rank_weight = 1.0 / (1.0 + 0.1 * owners)
+        return (overlap + POSITION_WEIGHT / (1.0 + positions)) * rank_weight
+
+    @staticmethod
+    def _pack(
+        scores: np.ndarray,
+        owners: List[int],
+        header_tokens: List[int],
+        sentence_tokens: List[int],
+        max_tokens: int
+    ) -> List[int]:
+        """Greedy by score; a source's header is paid for with its first sentence"""
+        used = 0
+        opened = set()
+        selected = []
+        for i in np.argsort(-scores, kind="stable"):
+            cost = sentence_tokens[i] + (0 if owners[i] in opened else header_tokens[owners[i]] + 2)
+            if used + cost > max_tokens:
+                continue
+            used += cost
+            opened.add(owners[i])
+            selected.append(int(i))
+        return selected
+
+    @staticmethod
+    def _render(headers: List[str], sentences: List[str], owners: List[int], selected: List[int]) -> str:
+        blocks = []
+        by_source: Dict[int, List[int]] = {}
+        for i in sorted(selected):
+            by_source.setdefault(owners[i], []).append(i)
+        for owner in sorted(by_source):
+            parts = []
+            previous = None
+            for i in by_source[owner]:
+                if previous is not None and i != previous + 1:
+                    parts.append("...")
+                parts.append(sentences[i])
+                previous = i
+            blocks.append(f"{headers[owner]}\n{' '.join(parts)}\n")
+        return "\n".join(blocks)
+
+def split_sentences(text: str) -> List[str]:
+    text = " ".join(text.split())
+    if text.endswith("..."):
+        # Display snippets are truncated mid-sentence
+        text = text[:-3].rstrip()
+    return [s for s in SENTENCE_BOUNDARY.split(text) if s]
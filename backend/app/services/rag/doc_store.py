@@ -0,0 +1,203 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import logging
+import zlib
+import numpy as np
+
+from app.services.rag.storage import StringTable, build_lock, publish_directory, staging_directory
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout changes
+FORMAT_VERSION = 1
+
+MISSING = -1
+
+class DocumentStore:
+    """Columnar, memory-mapped store of chunk text and metadata.
+
+    Rows follow ChromaDB collection order, the same numbering as the sparse
+    index built from it. Text is zlib-compressed per row and inflated on
+    demand; metadata values are interned per column so repeated values
+    (source, journal, title of sibling chunks) are stored once.
+
+    Directory layout:
+        meta.json         format version, fingerprint, column names
+        ids.bin           ChromaDB id per row
+        ids_offsets.npy
+        id_hash.npy       open-addressing table id -> row (int32, -1 = empty)
+        text.bin          compressed text per row
+        text_offsets.npy
+        columns.json      distinct values of each metadata column
+        codes.npy         (rows, columns) int32 value codes, -1 = missing
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / "meta.json") as f:
+            self.meta = json.load(f)
+
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Document store version {self.meta.get('version')} != {FORMAT_VERSION}"
+            )
+
+        self.num_docs = self.meta["num_docs"]
+        self.columns: List[str] = self.meta["columns"]
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+
+        self.ids = StringTable.open(self.path, "ids")
+        self.text = StringTable.open(self.path, "text")
+        self.id_hash = np.load(self.path / "id_hash.npy", mmap_mode="r")
+        self.codes = np.load(self.path / "codes.npy", mmap_mode="r")
+        with open(self.path / "columns.json") as f:
+            self.values: Dict[str, List[Any]] = json.load(f)
+
+    @property
+    def fingerprint(self) -> Dict:
+        return self.meta.get("fingerprint", {})
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def row(self, doc_id: str) -> int:
+        """Row of a ChromaDB id in O(1), or -1 if unknown"""
+        key = doc_id.encode("utf-8")
+        size = len(self.id_hash)
+        if size == 0:
+            return -1
+        slot = zlib.crc32(key) % size
+        while True:
+            row = int(self.id_hash[slot])
+            if row == -1:
+                return -1
+            if self.ids.get_bytes(row) == key:
+                return row
+            slot = (slot + 1) % size
+
+    def doc_id(self, row: int) -> str:
+        return self.ids.get(row)
+
+    def get_text(self, row: int) -> str:
+        """Decompress the text of a row"""
+        return zlib.decompress(self.text.get_bytes(row)).decode("utf-8")
+
+    def get_metadata(self, row: int) -> Dict[str, Any]:
+        """Rebuild the metadata dict of a row"""
+        metadata = {}
+        for i, name in enumerate(self.columns):
+            code = int(self.codes[row, i])
+            if code != MISSING:
+                metadata[name] = self.values[name][code]
+        return metadata
+
+    def column(self, name: str) -> Tuple[np.ndarray, List[Any]]:
+        """(codes per row, distinct values) of a metadata column"""
+        if name not in self.column_index:
+            return np.full(self.num_docs, MISSING, dtype=np.int32), []
+        return self.codes[:, self.column_index[name]], self.values[name]
+
+    def iter_documents(self) -> Iterator[Tuple[str, str]]:
+        """Yield (id, text) for every row in order"""
+        for row in range(self.num_docs):
+            yield self.doc_id(row), self.get_text(row)
+
+    @classmethod
+    def build(
+        cls,
+        path: Path,
+        records: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+        fingerprint: Dict
+    ) -> "DocumentStore":
+        """Build a store from (id, text, metadata) records and publish it at path"""
+        path = Path(path)
+        ids: List[bytes] = []
+        texts: List[bytes] = []
+        columns: Dict[str, Dict[Tuple[str, Any], int]] = {}
+        row_codes: List[Dict[str, int]] = []
+
+        for doc_id, text, metadata in records:
+            ids.append(doc_id.encode("utf-8"))
+            texts.append(zlib.compress((text or "").encode("utf-8")))
+            codes = {}
+            for name, value in (metadata or {}).items():
+                interned = columns.setdefault(name, {})
+                # Keep 1, 1.0 and True distinct
+                codes[name] = interned.setdefault((type(value).__name__, value), len(interned))
+            row_codes.append(codes)
+
+        names = sorted(columns)
+        codes = np.full((len(ids), len(names)), MISSING, dtype=np.int32)
+        for row, row_code in enumerate(row_codes):
+            for i, name in enumerate(names):
+                codes[row, i] = row_code.get(name, MISSING)
+        values = {
+            name: [value for (_, value) in columns[name]]
+            for name in names
+        }
+
+        tmp_path = staging_directory(path)
+        StringTable.write(tmp_path, "ids", ids)
+        StringTable.write(tmp_path, "text", texts)
+        np.save(tmp_path / "id_hash.npy", _build_id_hash(ids))
+        np.save(tmp_path / "codes.npy", codes)
+        with open(tmp_path / "columns.json", "w") as f:
+            json.dump(values, f)
+        with open(tmp_path / "meta.json", "w") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "fingerprint": fingerprint,
+                "num_docs": len(ids),
+                "columns": names
+            }, f, indent=2)
+
+        publish_directory(tmp_path, path)
+        logger.info(f"Document store built: {len(ids)} docs, {len(names)} metadata columns at {path}")
+        return cls(path)
+
+    @classmethod
+    def open_or_build(
+        cls,
+        path: Path,
+        fingerprint: Dict,
+        records: Callable[[], Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]]
+    ) -> "DocumentStore":
+        """Open the store at path, rebuilding it if missing, outdated or stale"""
+        path = Path(path)
+        store = cls._try_open(path, fingerprint)
+        if store is not None:
+            return store
+
+        with build_lock(path):
+            store = cls._try_open(path, fingerprint)
+            if store is not None:
+                return store
+            logger.info(f"Building document store at {path}...")
+            return cls.build(path, records(), fingerprint)
+
+    @classmethod
+    def _try_open(cls, path: Path, fingerprint: Dict) -> Optional["DocumentStore"]:
+        if not (path / "meta.json").exists():
+            return None
+        try:
+            store = cls(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable document store at {path}: {e}")
+            return None
+        if store.fingerprint != fingerprint:
+            logger.info(f"Document store at {path} is stale: {store.fingerprint} != {fingerprint}")
+            return None
+        logger.info(f"Opened document store: {store.num_docs} docs from {path}")
+        return store
+
+def _build_id_hash(ids: List[bytes]) -> np.ndarray:
+    """Linear-probing hash table at load factor <= 0.5"""
+    table = np.full(max(2 * len(ids), 1), -1, dtype=np.int32)
+    size = len(table)
+    for row, key in enumerate(ids):
+        slot = zlib.crc32(key) % size
+        while table[slot] != -1:
+            slot = (slot + 1) % size
+        table[slot] = row
+    return table
@@ -0,0 +1,210 @@
+from pathlib import Path
+from typing import List, Optional
+import copy
+import logging
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer, PreTrainedTokenizerBase
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("fp32", "bf16", "int8", "onnx", "onnx-int8")
+
+# Short biomedical queries used to compare a backend against fp32
+ACCURACY_PROBES = [
+    "statin efficacy in elderly patients",
+    "covid-19 vaccine effectiveness against hospitalization",
+    "metformin and risk of lactic acidosis in type 2 diabetes mellitus",
+    "blood pressure targets for hypertension in chronic kidney disease",
+    "immunotherapy response in non-small cell lung cancer",
+    "antibiotic prophylaxis for surgical site infection",
+    "sglt2 inhibitors heart failure outcomes randomized controlled trial",
+    "pediatric asthma inhaled corticosteroids growth",
+]
+
+class EmbeddingBackend:
+    """CLS embeddings from a BERT-style encoder"""
+
+    name = "base"
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, max_length: int = 512):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def tokenize(self, texts: List[str]):
+        return self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors='pt'
+        )
+
+    def forward(self, encoded) -> np.ndarray:
+        raise NotImplementedError
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), hidden) float32 CLS vectors"""
+        return self.forward(self.tokenize(texts))
+    
+    def share_memory(self):
+        """Make weights shareable with forked workers (copy-on-write otherwise)"""
+
+class TorchBackend(EmbeddingBackend):
+    """PyTorch CPU inference: fp32, bf16 weights or int8 dynamic quantization"""
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, model: torch.nn.Module, name: str = "fp32"):
+        super().__init__(tokenizer)
+        self.name = name
+        self.model = model.eval()
+
+    @classmethod
+    def from_fp32(cls, tokenizer: PreTrainedTokenizerBase, model: torch.nn.Module, name: str) -> "TorchBackend":
+        """Derive a backend from an fp32 model, leaving the original untouched"""
+        if name == "fp32":
+            return cls(tokenizer, model, name)
+        if name == "bf16":
+            return cls(tokenizer, copy.deepcopy(model).to(torch.bfloat16), name)
+        if name == "int8":
+            quantized = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            return cls(tokenizer, quantized, name)
+        raise ValueError(f"Unknown torch backend: {name}")
+
+    def share_memory(self):
+        # Weights move to shared memory, so workers never copy them even if
+        # something touches the pages
+        try:
+            self.model.share_memory()
+        except (RuntimeError, NotImplementedError) as e:
+            # Quantized packed params may not support it; fork's COW still shares them
+            logger.warning(f"Could not move {self.name} weights to shared memory: {e}")
+    
+    def forward(self, encoded) -> np.ndarray:
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=encoded['input_ids'],
+                attention_mask=encoded['attention_mask']
+            )
+            return outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
+
+class OnnxBackend(EmbeddingBackend):
+    """ONNX Runtime CPU inference of an exported (optionally int8) graph"""
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, model_path: Path, name: str = "onnx"):
+        super().__init__(tokenizer)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx requires onnxruntime (pip install onnxruntime)"
+            ) from e
+
+        self.name = name
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+
+    def tokenize(self, texts: List[str]):
+        return self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors='np'
+        )
+
+    def forward(self, encoded) -> np.ndarray:
+        last_hidden_state, = self.session.run(
+            ["last_hidden_state"],
+            {
+                "input_ids": encoded['input_ids'].astype(np.int64),
+                "attention_mask": encoded['attention_mask'].astype(np.int64)
+            }
+        )
+        return last_hidden_state[:, 0, :].astype(np.float32)
+
+def export_onnx(tokenizer: PreTrainedTokenizerBase, model: torch.nn.Module, path: Path, quantize: bool = False):
+    """Export the encoder to ONNX with dynamic batch/sequence axes"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fp32_path = path.with_suffix(".fp32.onnx") if quantize else path
+    sample = tokenizer(["onnx export sample"], return_tensors='pt')
+    dynamic = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model.eval(),
+            (sample['input_ids'], sample['attention_mask']),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state", "pooler_output"],
+            dynamic_axes={
+                "input_ids": dynamic,
+                "attention_mask": dynamic,
+                "last_hidden_state": dynamic
+            },
+            opset_version=14
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32_path), str(path), weight_type=QuantType.QInt8)
+    logger.info(f"Exported ONNX embedding model to {path}")
+
+def cosine_agreement(candidate: EmbeddingBackend, reference: EmbeddingBackend, texts: List[str]) -> float:
+    """Lowest cosine similarity between candidate and reference embeddings"""
+    a = candidate.encode(texts)
+    b = reference.encode(texts)
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return float(np.min(np.sum(a * b, axis=1)))
+
+def load_embedding_backend(
+    model_name: str,
+    backend: str = "fp32",
+    onnx_dir: str = "./models",
+    min_cosine: Optional[float] = 0.99
+) -> EmbeddingBackend:
+    """Load the configured backend, falling back to fp32 if it fails the accuracy check.
+
+    The corpus was embedded in fp32, so a faster backend is only accepted if
+    its query vectors stay within min_cosine of the fp32 ones on
+    ACCURACY_PROBES. Pass min_cosine=None to skip the check.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    needs_reference = backend != "fp32" and min_cosine is not None
+
+    model = None
+    if backend in ("fp32", "bf16", "int8") or needs_reference:
+        model = AutoModel.from_pretrained(model_name).eval()
+
+    if backend in ("onnx", "onnx-int8"):
+        slug = model_name.replace("/", "__")
+        onnx_path = Path(onnx_dir) / f"{slug}-{backend}.onnx"
+        if not onnx_path.exists():
+            if model is None:
+                model = AutoModel.from_pretrained(model_name).eval()
+            export_onnx(tokenizer, model, onnx_path, quantize=backend == "onnx-int8")
+        candidate = OnnxBackend(tokenizer, onnx_path, backend)
+    else:
+        candidate = TorchBackend.from_fp32(tokenizer, model, backend)
+
+    if not needs_reference:
+        logger.info(f"Embedding backend: {candidate.name}")
+        return candidate
+
+    reference = TorchBackend(tokenizer, model, "fp32")
+    agreement = cosine_agreement(candidate, reference, ACCURACY_PROBES)
+    if agreement < min_cosine:
+        logger.error(
+            f"Embedding backend {backend} failed accuracy check "
+            f"(min cosine {agreement:.4f} < {min_cosine}); using fp32"
+        )
+        return reference
+
+    logger.info(f"Embedding backend: {candidate.name} (min cosine vs fp32 {agreement:.4f})")
+    return candidate
@@ -0,0 +1,119 @@
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    """Coalesces concurrent query encodings into batched forward passes.
+
+    Each caller awaits its own vector. The first queued text opens a batch
+    that is held for at most max_wait_ms (or until max_batch_size texts are
+    queued); the batch is then encoded in one padded forward pass off the
+    event loop. At most max_in_flight batches run at once; while they do,
+    new arrivals queue up for the next one, so batch size grows with load.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_in_flight: int = 1,
+        executor: Optional[Executor] = None
+    ):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_in_flight = max(1, max_in_flight)
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.encoded = 0
+
+    async def encode(self, text: str) -> List[float]:
+        """Queue a text and wait for its CLS embedding"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Wait for a free slot before sealing the batch, so arrivals
+            # during busy periods join it instead of queueing behind it
+            await self._slots.acquire()
+            await self._fill(batch)
+            task = self._loop.create_task(self._encode_and_release(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _encode_and_release(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            await self._encode(batch)
+        finally:
+            self._slots.release()
+
+    async def _fill(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Collect more requests until the batch is full or max_wait elapses"""
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _encode(self, batch: List[Tuple[str, asyncio.Future]]):
+        pending = [(text, future) for text, future in batch if not future.done()]
+        if not pending:
+            return
+
+        texts = list(dict.fromkeys(text for text, _ in pending))
+        try:
+            vectors = await self._loop.run_in_executor(self.executor, self.encode_batch, texts)
+        except Exception as e:
+            logger.error(f"Batched embedding failed for {len(texts)} queries: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.encoded += len(texts)
+        by_text = {text: vectors[i].tolist() for i, text in enumerate(texts)}
+        for text, future in pending:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "encoded": self.encoded,
+            "avg_batch_size": self.encoded / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_in_flight": self.max_in_flight,
+            "max_wait_ms": self.max_wait * 1000
+        }
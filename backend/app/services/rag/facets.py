@@ -0,0 +1,218 @@
+from typing import Any, Dict, Iterable, List, Optional
+import ast
+import json
+import logging
+import re
+import numpy as np
+
+from app.services.rag.doc_store import MISSING, DocumentStore
+
+logger = logging.getLogger(__name__)
+
+YEAR_PATTERN = re.compile(r'\b(19|20)\d{2}\b')
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+# Roaring's cut-over: above 4096 rows a 8 KiB bitmap is smaller than an array
+ARRAY_MAX = 4096
+
+def extract_year(value: Any) -> Optional[int]:
+    """First 19xx/20xx year in a publication date"""
+    if not value:
+        return None
+    match = YEAR_PATTERN.search(str(value))
+    return int(match.group(0)) if match else None
+
+def normalize_mesh_term(term: str) -> str:
+    """Canonical form used for exact MeSH matching"""
+    return " ".join(str(term).strip().strip("*").lower().split())
+
+def parse_mesh_terms(value: Any) -> List[str]:
+    """Split a stored mesh_terms value into normalized terms.
+
+    ChromaDB metadata cannot hold lists, so the corpus stores them as a
+    list literal ("['A', 'B']") or a ';' / '|' separated string. Terms with
+    a qualifier ("Diabetes Mellitus/drug therapy") also index the bare
+    descriptor.
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        raw = list(value)
+    else:
+        text = str(value).strip()
+        raw = None
+        if text.startswith("["):
+            for parse in (json.loads, ast.literal_eval):
+                try:
+                    parsed = parse(text)
+                except (ValueError, SyntaxError):
+                    continue
+                if isinstance(parsed, (list, tuple)):
+                    raw = list(parsed)
+                    break
+        if raw is None:
+            raw = re.split(r"[;|]", text)
+
+    terms = []
+    for term in raw:
+        normalized = normalize_mesh_term(term)
+        if not normalized:
+            continue
+        terms.append(normalized)
+        if "/" in normalized:
+            terms.append(normalized.split("/", 1)[0].strip())
+    return list(dict.fromkeys(terms))
+
+class RowSet:
+    """Compressed set of document rows (roaring-style).
+
+    Rows are split into 2^16-row chunks; each chunk is stored as a sorted
+    uint16 array while sparse and as a packed bitmap once it holds more
+    than ARRAY_MAX rows.
+    """
+
+    def __init__(self, rows: np.ndarray, num_rows: int):
+        self.num_rows = num_rows
+        self.cardinality = len(rows)
+        self.containers: Dict[int, np.ndarray] = {}
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        chunk_ids = rows >> CHUNK_BITS
+        bounds = np.flatnonzero(np.diff(chunk_ids)) + 1
+        for chunk in np.split(rows, bounds) if len(rows) else []:
+            key = int(chunk[0] >> CHUNK_BITS)
+            low = (chunk & (CHUNK_SIZE - 1)).astype(np.uint16)
+            if len(low) > ARRAY_MAX:
+                bits = np.zeros(CHUNK_SIZE, dtype=bool)
+                bits[low] = True
+                self.containers[key] = np.packbits(bits)
+            else:
+                self.containers[key] = low
+
+    def __len__(self) -> int:
+        return self.cardinality
+
+    def to_mask(self) -> np.ndarray:
+        """Dense bool mask over all rows"""
+        mask = np.zeros(self.num_rows, dtype=bool)
+        for key, container in self.containers.items():
+            base = key << CHUNK_BITS
+            if container.dtype == np.uint8:
+                bits = np.unpackbits(container).astype(bool)
+                end = min(base + CHUNK_SIZE, self.num_rows)
+                mask[base:end] |= bits[:end - base]
+            else:
+                mask[base + container.astype(np.int64)] = True
+        return mask
+
+    def nbytes(self) -> int:
+        return sum(container.nbytes for container in self.containers.values())
+
+    @staticmethod
+    def union_mask(sets: Iterable["RowSet"], num_rows: int) -> np.ndarray:
+        mask = np.zeros(num_rows, dtype=bool)
+        for row_set in sets:
+            mask |= row_set.to_mask()
+        return mask
+
+class FacetIndex:
+    """Per-document facet values parsed once when the index is loaded.
+
+    Holds an integer publication-year column and compressed row sets per
+    source and per MeSH term, so filter evaluation is a bitwise AND of
+    masks instead of per-candidate regex and substring matching.
+    """
+
+    def __init__(self, store: DocumentStore):
+        self.num_rows = len(store)
+
+        # Publication year per row (0 = unknown) and per distinct date value
+        date_codes, date_values = store.column("publication_date")
+        self.date_values = date_values
+        self.date_value_years = np.array(
+            [extract_year(value) or 0 for value in date_values] + [0], dtype=np.int16
+        )
+        self.years = self.date_value_years[date_codes]
+
+        # Source type -> rows
+        source_codes, source_values = store.column("source")
+        self.source_values = source_values
+        self.sources: Dict[str, RowSet] = {}
+        for code, rows in _group_rows(source_codes).items():
+            self.sources[str(source_values[code])] = RowSet(rows, self.num_rows)
+
+        # MeSH term -> rows, and -> distinct stored values containing it
+        mesh_codes, mesh_values = store.column("mesh_terms")
+        self.mesh_values = mesh_values
+        term_rows: Dict[str, List[np.ndarray]] = {}
+        term_value_codes: Dict[str, List[int]] = {}
+        for code, rows in _group_rows(mesh_codes).items():
+            for term in parse_mesh_terms(mesh_values[code]):
+                term_rows.setdefault(term, []).append(rows)
+                term_value_codes.setdefault(term, []).append(code)
+        self.mesh: Dict[str, RowSet] = {
+            term: RowSet(np.concatenate(rows), self.num_rows)
+            for term, rows in term_rows.items()
+        }
+        self.mesh_value_codes = term_value_codes
+
+        logger.info(
+            f"Facet index: {len(self.sources)} sources, {len(self.mesh)} MeSH terms, "
+            f"{self.nbytes() / 1024:.0f} KiB"
+        )
+
+    def source_mask(self, sources: Iterable[str]) -> np.ndarray:
+        return RowSet.union_mask(
+            (self.sources[s] for s in sources if s in self.sources), self.num_rows
+        )
+
+    def year_mask(self, start: Optional[int], end: Optional[int]) -> np.ndarray:
+        mask = self.years > 0
+        if start is not None:
+            mask &= self.years >= start
+        if end is not None:
+            mask &= self.years <= end
+        return mask
+
+    def mesh_mask(self, terms: Iterable[str]) -> np.ndarray:
+        """Rows tagged with any of the terms (exact, normalized match)"""
+        normalized = {normalize_mesh_term(term) for term in terms}
+        return RowSet.union_mask(
+            (self.mesh[t] for t in normalized if t in self.mesh), self.num_rows
+        )
+
+    def date_values_in_range(self, start: Optional[int], end: Optional[int]) -> List[Any]:
+        years = self.date_value_years[:-1]
+        ok = years > 0
+        if start is not None:
+            ok &= years >= start
+        if end is not None:
+            ok &= years <= end
+        return [value for value, keep in zip(self.date_values, ok) if keep]
+
+    def mesh_values_with(self, terms: Iterable[str]) -> List[Any]:
+        codes = set()
+        for term in {normalize_mesh_term(term) for term in terms}:
+            codes.update(self.mesh_value_codes.get(term, []))
+        return [self.mesh_values[code] for code in sorted(codes)]
+
+    def nbytes(self) -> int:
+        return (
+            self.years.nbytes
+            + sum(s.nbytes() for s in self.sources.values())
+            + sum(s.nbytes() for s in self.mesh.values())
+        )
+
+def _group_rows(codes: np.ndarray) -> Dict[int, np.ndarray]:
+    """Rows per value code (missing values skipped) in one sort"""
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = np.asarray(codes)[order]
+    present = sorted_codes != MISSING
+    order, sorted_codes = order[present], sorted_codes[present]
+    if not len(order):
+        return {}
+    bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+    return {
+        int(sorted_codes[start]): rows
+        for start, rows in zip(np.concatenate([[0], bounds]), np.split(order, bounds))
+    }
@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Optional
+import logging
+import numpy as np
+
+from app.models.schemas import SearchFilters, SourceType
+from app.services.rag.facets import FacetIndex
+
+logger = logging.getLogger(__name__)
+
+# Larger $in lists are left out of the ChromaDB where clause and enforced
+# by the row mask on an over-fetched result instead
+MAX_WHERE_VALUES = 500
+
+class RetrievalFilter:
+    """SearchFilters compiled against the facet index.
+
+    `mask` marks the rows that satisfy every constraint and restricts the
+    BM25 branch; `where` is the ChromaDB clause for the semantic branch.
+    When `exact` is False some constraint could not be expressed in
+    `where`, so semantic hits must also be checked against the mask.
+    """
+
+    def __init__(self, mask: np.ndarray, where: Optional[Dict[str, Any]], exact: bool):
+        self.mask = mask
+        self.where = where
+        self.exact = exact
+
+    @property
+    def empty(self) -> bool:
+        return not self.mask.any()
+
+    def allows(self, row: int) -> bool:
+        return row >= 0 and bool(self.mask[row])
+
+def compile_filters(filters: Optional[SearchFilters], facets: FacetIndex) -> Optional[RetrievalFilter]:
+    """Translate SearchFilters into a row mask and ChromaDB where clause.
+
+    Returns None when the filters do not restrict anything. The mask is the
+    AND of the facet masks; rows missing a filtered field are excluded and
+    MeSH terms match exactly (case-insensitive) rather than by substring.
+    """
+    if not filters:
+        return None
+
+    # (column, row mask, distinct stored values that satisfy the constraint)
+    constraints: List[tuple] = []
+
+    if filters.source_types and SourceType.ALL not in filters.source_types:
+        allowed = [st.value for st in filters.source_types]
+        constraints.append((
+            "source",
+            facets.source_mask(allowed),
+            [value for value in facets.source_values if value in allowed]
+        ))
+
+    if filters.date_range and (filters.date_range.start_date or filters.date_range.end_date):
+        start = int(filters.date_range.start_date[:4]) if filters.date_range.start_date else None
+        end = int(filters.date_range.end_date[:4]) if filters.date_range.end_date else None
+        constraints.append((
+            "publication_date",
+            facets.year_mask(start, end),
+            facets.date_values_in_range(start, end)
+        ))
+
+    if filters.mesh_terms:
+        constraints.append((
+            "mesh_terms",
+            facets.mesh_mask(filters.mesh_terms),
+            facets.mesh_values_with(filters.mesh_terms)
+        ))
+
+    if not constraints:
+        return None
+
+    mask = np.ones(facets.num_rows, dtype=bool)
+    clauses = []
+    exact = True
+    for column, column_mask, matching_values in constraints:
+        mask &= column_mask
+        if len(matching_values) <= MAX_WHERE_VALUES:
+            clauses.append({column: {"$in": matching_values}})
+        else:
+            exact = False
+
+    where = None
+    if len(clauses) == 1:
+        where = clauses[0]
+    elif clauses:
+        where = {"$and": clauses}
+
+    logger.info(f"Filters match {int(mask.sum())}/{facets.num_rows} documents (exact where: {exact})")
+    return RetrievalFilter(mask, where, exact)
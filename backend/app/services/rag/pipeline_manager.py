@@ -0,0 +1,96 @@
+from app.core.config import settings
+from app.services.rag.rag_pipeline import RAGPipeline
+from typing import Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class RAGPipelineManager:
+    """Owns the process-wide RAG pipeline: one build, started at app startup"""
+    pipeline: Optional[RAGPipeline] = None
+    error: Optional[str] = None
+    load_seconds: Optional[float] = None
+    _preloaded: Optional[RAGPipeline] = None
+    _lock: Optional[asyncio.Lock] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def preload(cls, pipeline: RAGPipeline):
+        """Adopt a pipeline built before fork(); each worker still warms it up"""
+        cls._preloaded = pipeline
+
+    @classmethod
+    def start(cls):
+        """Begin loading in the background so startup (and /ready) are not blocked"""
+        if cls._task is None and cls.pipeline is None:
+            cls._task = asyncio.create_task(cls._load_in_background())
+
+    @classmethod
+    async def _load_in_background(cls):
+        try:
+            await cls.load()
+        except Exception:
+            # Recorded in cls.error; requests retry the load
+            pass
+
+    @classmethod
+    async def load(cls) -> RAGPipeline:
+        """Build and warm the pipeline once; concurrent callers wait for the same build"""
+        if cls.pipeline is not None:
+            return cls.pipeline
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:
+            if cls.pipeline is not None:
+                return cls.pipeline
+
+            start = time.perf_counter()
+            cls.error = None
+            try:
+                pipeline = cls._preloaded or await asyncio.to_thread(RAGPipeline)
+                if settings.PIPELINE_WARM_UP:
+                    await asyncio.to_thread(pipeline.warm_up)
+            except Exception as e:
+                cls.error = str(e)
+                logger.error(f"Failed to load RAG pipeline: {e}")
+                raise
+
+            cls.pipeline = pipeline
+            cls.load_seconds = time.perf_counter() - start
+            logger.info(f"RAG pipeline ready in {cls.load_seconds:.1f}s")
+            return pipeline
+
+    @classmethod
+    async def get_pipeline(cls) -> RAGPipeline:
+        """The ready pipeline, waiting for (or starting) the build if needed"""
+        if cls.pipeline is not None:
+            return cls.pipeline
+        return await cls.load()
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return cls.pipeline is not None
+
+    @classmethod
+    def status(cls) -> dict:
+        if cls.pipeline is not None:
+            state = "ready"
+        elif cls.error is not None:
+            state = "failed"
+        else:
+            state = "loading" if cls._task is not None else "not_started"
+        return {"status": state, "error": cls.error, "load_seconds": cls.load_seconds}
+
+    @classmethod
+    async def close(cls):
+        """Stop a pending load and release the pipeline's executor"""
+        if cls._task is not None and not cls._task.done():
+            cls._task.cancel()
+        cls._task = None
+        if cls.pipeline is not None:
+            cls.pipeline.close()
+            cls.pipeline = None
+            logger.info("RAG pipeline closed")
@@ -1,84 +1,252 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from transformers import AutoTokenizer, AutoModel
-import torch
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, AsyncIterator, Iterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
 import logging
+import os
+import sqlite3
+import time
+import weakref
 from pathlib import Path
-import re
+import hashlib
 import numpy as np
-from rank_bm25 import BM25Okapi
 
 from app.core.config import settings
-from app.services.llm.groq_client import GroqClient
+from app.core.metrics import observe_stage, register_cache, timed
+from app.core.tracing import set_attributes, traced
+from app.services.llm.groq_client import GroqClient, get_groq_client
+from app.services.cache.tiered_cache import build_tiered_cache
+from app.services.rag.collapse import collapse_by_paper, next_candidate_count, paper_id_of
+from app.services.rag.context_builder import ContextBuilder, TokenCounter
+from app.services.rag.doc_store import DocumentStore
+from app.services.rag.embedding_backend import load_embedding_backend
+from app.services.rag.facets import FacetIndex, extract_year, normalize_mesh_term, parse_mesh_terms
+from app.services.rag.filters import RetrievalFilter, compile_filters
+from app.services.rag.embedding_batcher import EmbeddingBatcher
+from app.services.rag.sparse_index import SparseIndex, tokenize
 from app.models.schemas import SearchRequest, SourceEvidence, SearchFilters, DateRange, SourceType
 
 logger = logging.getLogger(__name__)
 
+# Pipelines in this process, restarted in forked children
+_live_pipelines: "weakref.WeakSet[RAGPipeline]" = weakref.WeakSet()
+
+# Candidates each retrieval branch returns in the first round
+CANDIDATES_PER_BRANCH = 100
+
+# Minimum fused score for a chunk to be returned
+FUSION_THRESHOLD = 0.3
+
+# Semantic over-fetch factor when a filter cannot be fully expressed in ChromaDB
+SEMANTIC_FILTER_OVERFETCH = 4
+
+# Collection metadata keys an ingestion job may set to version the corpus
+CORPUS_MARKER_KEYS = ("corpus_version", "ingested_at")
+
 class RAGPipeline:
     """RAG pipeline with Hybrid Search (BM25 + Semantic)"""
     
-    def __init__(self):
+    def __init__(self, llm_client: Optional[GroqClient] = None):
         # Initialize ChromaDB
         chroma_path = Path(settings.CHROMADB_PATH)
         if not chroma_path.exists():
             raise FileNotFoundError(f"ChromaDB path not found: {chroma_path}")
         
-        self.chroma_client = chromadb.PersistentClient(
-            path=str(chroma_path),
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
-        
         try:
-            self.collection = self.chroma_client.get_collection(settings.CHROMADB_COLLECTION)
+            self._connect_chroma()
             logger.info(f"Connected to ChromaDB: {settings.CHROMADB_COLLECTION}")
             logger.info(f"Collection size: {self.collection.count()} documents")
         except Exception as e:
             logger.error(f"Failed to get ChromaDB collection: {e}")
             raise
         
-        # Initialize PubMedBERT
-        logger.info("Loading PubMedBERT...")
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            "microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract"
-        )
-        self.embedding_model = AutoModel.from_pretrained(
-            "microsoft/BiomedNLP-PubMedBERT-base-uncased-abstract"
+        # Query embedding cache, keyed on model id, backend and expanded query
+        self.embedding_cache = build_tiered_cache(
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+            disk_path=settings.EMBEDDING_CACHE_PATH
         )
-        self.device = torch.device('cpu')
-        self.embedding_model = self.embedding_model.to(self.device)
-        self.embedding_model.eval()
-        logger.info("PubMedBERT loaded")
+        register_cache("query_embeddings", self.embedding_cache.stats)
+        
+        self._start_workers()
+        _live_pipelines.add(self)
         
-        # Initialize LLM
-        self.llm_client = GroqClient()
+        # PubMedBERT, the on-disk indexes and the LLM tokenizer are
+        # independent: load them side by side
+        logger.info("Loading PubMedBERT, BM25 index and context tokenizer...")
+        model_load = self.executor.submit(self.load_embedding_model)
+        index_load = self.executor.submit(self.build_bm25_index)
+        tokenizer_load = self.executor.submit(TokenCounter, settings.CONTEXT_TOKENIZER)
+        model_load.result()
+        index_load.result()
+        self.context_builder = ContextBuilder(tokenizer_load.result())
         
-        # Build BM25 index for keyword search
-        logger.info("Building BM25 index...")
-        self.build_bm25_index()
+        # Initialize LLM (shared with the validation agents)
+        self.llm_client = llm_client or get_groq_client()
         
         logger.info("RAG Pipeline initialized with Hybrid Search")
     
+    def _connect_chroma(self):
+        """Open the ChromaDB client and collection. Its SQLite connections must
+        not cross fork(), so forked workers call this again"""
+        self.chroma_client = chromadb.PersistentClient(
+            path=settings.CHROMADB_PATH,
+            settings=ChromaSettings(anonymized_telemetry=False)
+        )
+        self.collection = self.chroma_client.get_collection(settings.CHROMADB_COLLECTION)
+    
+    def _reconnect_chroma_after_fork(self):
+        # Clients for a path share one cached System, and with it the
+        # parent's connections: drop the cache so the child opens its own
+        self.chroma_client.clear_system_cache()
+        self._connect_chroma()
+    
+    def _start_workers(self):
+        """Create the executor-side state; threads do not survive fork(), so
+        forked workers call this again"""
+        # Blocking retrieval stages run on a bounded executor, each stage
+        # capped so one heavy query cannot take every thread
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.RETRIEVAL_EXECUTOR_WORKERS,
+            thread_name_prefix="retrieval"
+        )
+        self.stage_limits = {
+            "bm25": asyncio.Semaphore(settings.BM25_CONCURRENCY),
+            "semantic": asyncio.Semaphore(settings.SEMANTIC_CONCURRENCY)
+        }
+        
+        # Concurrent searches share batched forward passes
+        self.embedding_batcher = EmbeddingBatcher(
+            self.encode_batch,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            max_in_flight=settings.EMBEDDING_CONCURRENCY,
+            executor=self.executor
+        )
+    
+    def load_embedding_model(self):
+        """Load PubMedBERT on the configured CPU inference backend"""
+        self.embedding_backend = load_embedding_backend(
+            settings.EMBEDDING_MODEL,
+            backend=settings.EMBEDDING_BACKEND,
+            onnx_dir=settings.EMBEDDING_ONNX_DIR,
+            min_cosine=settings.EMBEDDING_MIN_COSINE if settings.EMBEDDING_ACCURACY_CHECK else None
+        )
+        logger.info("PubMedBERT loaded")
+    
+    def warm_up(self):
+        """Run one query through every retrieval stage.
+        
+        Pays for lazy allocations (first forward pass, HNSW segment load,
+        page-in of the memory-mapped indexes) before real traffic arrives.
+        The warm-up query bypasses the embedding cache.
+        """
+        query = "efficacy of statins in elderly patients"
+        embedding = self.encode_batch([self.expand_query(query)])[0].tolist()
+        self._bm25_search(query)
+        self._semantic_search(embedding)
+        logger.info("RAG Pipeline warmed up")
+    
+    def prepare_for_fork(self):
+        """Move model weights to shared memory before forking workers.
+        
+        The document store and BM25 index are already memory-mapped, so
+        forked workers share their pages through the OS page cache. The
+        loader threads are stopped so the fork happens single-threaded;
+        each child starts its own, and reopens ChromaDB rather than use the
+        master's SQLite connections.
+        """
+        self.embedding_backend.share_memory()
+        self.executor.shutdown(wait=True)
+    
+    def close(self):
+        """Stop the retrieval executor"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
     def build_bm25_index(self):
-        """Build BM25 index for keyword matching"""
+        """Open the persisted document store and BM25 index (building them once if
+        missing or stale) and parse the filter facets"""
         try:
-            results = self.collection.get(
-                limit=100000,
-                include=['documents', 'metadatas']
+            fingerprint = {
+                "collection": settings.CHROMADB_COLLECTION,
+                "count": self.collection.count(),
+                "signature": self._corpus_signature()
+            }
+            # Identifies the indexed corpus, e.g. to scope cached responses
+            self.corpus_version = fingerprint
+            index_dir = Path(settings.SPARSE_INDEX_DIR)
+            self.doc_store = DocumentStore.open_or_build(
+                index_dir / "documents",
+                fingerprint,
+                self._iter_collection_records
             )
-            
-            self.bm25_docs = results['documents']
-            self.bm25_ids = results['ids']
-            self.bm25_metadatas = results['metadatas']
-            
-            # Tokenize for BM25
-            tokenized_docs = [doc.lower().split() for doc in self.bm25_docs]
-            self.bm25_index = BM25Okapi(tokenized_docs)
-            
-            logger.info(f"BM25 index built with {len(self.bm25_docs)} documents")
+            self.bm25_index = SparseIndex.open_or_build(
+                index_dir / "bm25",
+                fingerprint,
+                self.doc_store.iter_documents
+            )
+            self.facets = FacetIndex(self.doc_store)
+            logger.info(f"BM25 index ready with {self.bm25_index.num_docs} documents")
         except Exception as e:
-            logger.error(f"Failed to build BM25 index: {e}")
+            logger.error(f"Failed to load BM25 index: {e}")
+            self.doc_store = None
             self.bm25_index = None
+            self.facets = None
+            self.corpus_version = {"collection": settings.CHROMADB_COLLECTION, "count": None, "signature": None}
+    
+    def _corpus_signature(self) -> Optional[str]:
+        """Cheap signal of the collection's contents, so edits that keep the chunk
+        count still invalidate the persisted indexes and every corpus-scoped cache
+        
+        An ingest marker from the collection metadata (CORPUS_MARKER_KEYS) wins
+        when the ingestion job sets one. Otherwise this is the highest write
+        sequence number Chroma has applied to the collection's segments, which
+        every add, update, upsert and delete advances. It is read from Chroma's
+        SQLite catalog in one indexed query and never scans the corpus. None
+        when neither is available: then only count changes are detected.
+        """
+        metadata = self.collection.metadata or {}
+        for key in CORPUS_MARKER_KEYS:
+            if metadata.get(key):
+                return f"{key}:{metadata[key]}"
+        
+        catalog = Path(settings.CHROMADB_PATH) / "chroma.sqlite3"
+        try:
+            connection = sqlite3.connect(f"file:{catalog}?mode=ro", uri=True)
+            try:
+                (seq_id,) = connection.execute(
+                    "SELECT MAX(seq_id) FROM max_seq_id WHERE segment_id IN "
+                    "(SELECT id FROM segments WHERE collection = ?)",
+                    (str(self.collection.id),)
+                ).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read Chroma write sequence ({e}); only count changes invalidate the indexes")
+            return None
+        if seq_id is None:
+            return None
+        # Older Chroma versions store sequence ids as big-endian bytes
+        if isinstance(seq_id, bytes):
+            seq_id = int.from_bytes(seq_id, "big")
+        return f"seq:{seq_id}"
+    
+    def _iter_collection_records(self, batch_size: int = 5000) -> Iterator[Tuple[str, str, Dict]]:
+        """Page through every (id, document, metadata) in the ChromaDB collection"""
+        offset = 0
+        while True:
+            results = self.collection.get(
+                limit=batch_size,
+                offset=offset,
+                include=['documents', 'metadatas']
+            )
+            if not results['ids']:
+                break
+            yield from zip(results['ids'], results['documents'], results['metadatas'])
+            offset += len(results['ids'])
     
     def expand_query(self, query: str) -> str:
         """Expand medical query with synonyms"""
@@ -103,79 +271,193 @@ class RAGPipeline:
             return f"{query} {' '.join(expanded_terms)}"
         return query
     
-    def generate_query_embedding(self, query: str) -> List[float]:
-        """Generate query embedding with expansion"""
-        expanded_query = self.expand_query(query)
-        
+    async def embed_query(self, query: str) -> List[float]:
+        """Async query embedding: cached, else micro-batched with concurrent queries"""
+        with timed("embedding"):
+            expanded_query = self.expand_query(query)
+            
+            cache_key = self._embedding_cache_key(expanded_query)
+            cached = await self.embedding_cache.aget(cache_key, self.executor)
+            set_attributes(cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+            
+            embedding = await self.embedding_batcher.encode(expanded_query)
+            await self.embedding_cache.aset(cache_key, embedding, self.executor)
+            return embedding
+    
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """CLS embeddings for a batch of texts in one padded forward pass"""
         try:
-            with torch.no_grad():
-                encoded = self.tokenizer(
-                    expanded_query,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors='pt'
-                )
-                
-                input_ids = encoded['input_ids'].to(self.device)
-                attention_mask = encoded['attention_mask'].to(self.device)
-                
-                outputs = self.embedding_model(
-                    input_ids=input_ids,
-                    attention_mask=attention_mask
-                )
-                
-                embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
-                
-            return embedding.tolist()
+            return self.embedding_backend.encode(texts)
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
     
-    def hybrid_search(
+    def _embedding_cache_key(self, expanded_query: str) -> str:
+        digest = hashlib.sha256(expanded_query.encode("utf-8")).hexdigest()
+        return f"{settings.EMBEDDING_MODEL}:{self.embedding_backend.name}:{digest}"
+    
+    @traced("hybrid_search")
+    async def hybrid_search(
         self,
         query: str,
-        query_embedding: List[float],
-        top_k: int = 50
+        query_embedding: Optional[List[float]] = None,
+        top_k: int = 50,
+        retrieval_filter: Optional[RetrievalFilter] = None
     ) -> List[SourceEvidence]:
-        """Hybrid search: BM25 (70%) + Semantic (30%) with threshold filtering"""
+        """Hybrid search: BM25 (70%) + Semantic (30%) with threshold filtering
+        
+        The BM25 branch and the semantic branch (query embedding, then
+        ChromaDB) run concurrently on the retrieval executor and are fused
+        once both finish. A retrieval_filter is applied inside both
+        branches, so every candidate already satisfies it.
+        
+        With COLLAPSE_BY_PAPER, top_k counts distinct papers: chunks are
+        grouped by paper (see collapse.py), each returned chunk carries its
+        paper's pooled score as relevance_score, and, when the candidates yield
+        fewer than top_k papers, both branches are re-queried with more
+        candidates until enough papers are found or no unseen chunk could
+        still pass the threshold.
+        """
+        if retrieval_filter is not None and retrieval_filter.empty:
+            logger.info("Filters match no documents")
+            return []
+        
+        embedding = query_embedding
+        
+        async def semantic_branch(n_candidates: int):
+            nonlocal embedding
+            if embedding is None:
+                embedding = await self.embed_query(query)
+            return await self._run_stage("semantic", self._semantic_search, embedding, retrieval_filter, n_candidates)
+        
+        n_candidates = CANDIDATES_PER_BRANCH
+        rounds = 0
+        # Summed over rounds: one fusion observation per search
+        fusion_seconds = 0.0
+        while True:
+            rounds += 1
+            bm25_scores, (semantic_scores, doc_data) = await asyncio.gather(
+                self._run_stage("bm25", self._bm25_search, query, retrieval_filter, n_candidates),
+                semantic_branch(n_candidates)
+            )
+            set_attributes(
+                top_k=top_k, rounds=rounds, candidates_per_branch=n_candidates,
+                bm25_candidates=len(bm25_scores), semantic_candidates=len(semantic_scores)
+            )
+            fusion_start = time.perf_counter()
+            ranked = self._combine(bm25_scores, semantic_scores)
+            papers = None
+            if settings.COLLAPSE_BY_PAPER:
+                papers = collapse_by_paper(ranked, settings.COLLAPSE_CHUNKS_PER_PAPER, settings.COLLAPSE_POOLING)
+            fusion_seconds += time.perf_counter() - fusion_start
+            
+            if papers is None or len(papers) >= top_k or n_candidates >= settings.RETRIEVAL_MAX_CANDIDATES:
+                break
+            if not self._may_have_more(bm25_scores, semantic_scores, n_candidates):
+                break
+            n_candidates = next_candidate_count(n_candidates, len(papers), top_k, settings.RETRIEVAL_MAX_CANDIDATES)
+            logger.info(f"Collapse: {len(papers)}/{top_k} papers; re-fetching {n_candidates} candidates per branch")
+        observe_stage("fusion", fusion_seconds)
+        set_attributes(fusion_ms=round(fusion_seconds * 1000, 3))
+        
+        if papers is None:
+            hits = ranked[:top_k]
+            set_attributes(fused_candidates=len(ranked))
+        else:
+            # Sources report their paper's pooled score, the one papers are ranked by
+            hits = [(doc_id, paper.score) for paper in papers[:top_k] for doc_id, _ in paper.chunks]
+            set_attributes(fused_candidates=len(ranked), papers=len(papers))
+            logger.info(f"Collapse: {len(ranked)} chunks into {len(papers)} papers, keeping {min(len(papers), top_k)}")
+        with timed("build_sources"):
+            return self._build_sources(hits, doc_data)
+    
+    def _may_have_more(self, bm25_scores: Dict[str, float], semantic_scores: Dict[str, float], n_candidates: int) -> bool:
+        """Whether chunks beyond the fetched candidates could still pass the fusion threshold
         
-        # 1. BM25 keyword search
+        An unseen chunk scores at most the last fetched candidate of each
+        branch that returned a full page; a branch that returned fewer has
+        nothing more to give.
+        """
+        max_bm25 = max(bm25_scores.values()) if bm25_scores else 1
+        bm25_bound = min(bm25_scores.values()) / max_bm25 if len(bm25_scores) >= n_candidates else 0.0
+        semantic_bound = min(semantic_scores.values()) if len(semantic_scores) >= n_candidates else 0.0
+        return bm25_bound * 0.7 + semantic_bound * 0.3 >= FUSION_THRESHOLD
+    
+    async def _run_stage(self, stage: str, func: Callable, *args):
+        """Run a blocking retrieval stage on the executor under its concurrency limit"""
+        async with self.stage_limits[stage]:
+            # Timed here: executor threads do not see the request's context
+            with timed(stage):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+    
+    def _bm25_search(
+        self,
+        query: str,
+        retrieval_filter: Optional[RetrievalFilter] = None,
+        n_candidates: int = CANDIDATES_PER_BRANCH
+    ) -> Dict[str, float]:
+        """BM25 keyword search, restricted to rows allowed by the filter"""
         bm25_scores = {}
         if self.bm25_index:
-            query_tokens = query.lower().split()
-            scores = self.bm25_index.get_scores(query_tokens)
+            query_tokens = tokenize(query)
+            allowed = retrieval_filter.mask if retrieval_filter is not None else None
             
-            # Get top 100 from BM25
-            top_indices = np.argsort(scores)[-100:][::-1]
-            for idx in top_indices:
-                if scores[idx] > 0:
-                    bm25_scores[self.bm25_ids[idx]] = scores[idx]
+            # Get top candidates from BM25 (pruned, touches only query-term postings)
+            for row, score in self.bm25_index.top_k(query_tokens, n_candidates, allowed):
+                bm25_scores[self.bm25_index.doc_id(row)] = score
             
             logger.info(f"BM25 found {len(bm25_scores)} matches")
+        return bm25_scores
+    
+    def _semantic_search(
+        self,
+        query_embedding: List[float],
+        retrieval_filter: Optional[RetrievalFilter] = None,
+        n_candidates: int = CANDIDATES_PER_BRANCH
+    ) -> Tuple[Dict[str, float], Dict[str, Dict]]:
+        """Semantic search; returns (similarity by id, metadata/document by id)"""
+        n_results = n_candidates
+        where = None
+        if retrieval_filter is not None:
+            where = retrieval_filter.where
+            if not retrieval_filter.exact:
+                # Part of the filter is enforced by the mask: over-fetch
+                n_results *= SEMANTIC_FILTER_OVERFETCH
         
-        # 2. Semantic search
         semantic_results = self.collection.query(
             query_embeddings=[query_embedding],
-            n_results=100,
+            n_results=n_results,
+            where=where,
             include=['metadatas', 'documents', 'distances']
         )
         
         semantic_scores = {}
-        semantic_data = {}
+        doc_data = {}
         for i in range(len(semantic_results['ids'][0])):
             doc_id = semantic_results['ids'][0][i]
+            if retrieval_filter is not None and not retrieval_filter.exact:
+                if not retrieval_filter.allows(self.doc_store.row(doc_id)):
+                    continue
+                if len(semantic_scores) >= n_candidates:
+                    break
             distance = semantic_results['distances'][0][i]
             similarity = max(0, 1 - distance)
             semantic_scores[doc_id] = similarity
-            semantic_data[doc_id] = {
+            doc_data[doc_id] = {
                 'metadata': semantic_results['metadatas'][0][i],
                 'document': semantic_results['documents'][0][i]
             }
         
         logger.info(f"Semantic search found {len(semantic_scores)} matches")
+        return semantic_scores, doc_data
+    
+    def _combine(self, bm25_scores: Dict[str, float], semantic_scores: Dict[str, float]) -> List[Tuple[str, float]]:
+        """Combine branch scores; chunk ids above the threshold, best first"""
         
-        # 3. Combine scores (BM25 70%, Semantic 30%)
+        # 1. Combine scores (BM25 70%, Semantic 30%)
         all_doc_ids = set(bm25_scores.keys()) | set(semantic_scores.keys())
         combined_scores = {}
         
@@ -187,26 +469,29 @@ class RAGPipeline:
             sem_score = semantic_scores.get(doc_id, 0) * 0.3
             combined_scores[doc_id] = bm25_score + sem_score
         
-        # 4. Sort and filter by threshold (0.3 = 30%)
+        # 2. Sort and filter by threshold (0.3 = 30%)
         sorted_ids = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
-        filtered_ids = [(doc_id, score) for doc_id, score in sorted_ids if score >= 0.3][:top_k]
+        filtered_ids = [(doc_id, score) for doc_id, score in sorted_ids if score >= FUSION_THRESHOLD]
         
-        logger.info(f"Hybrid: {len(filtered_ids)} docs above 0.3 threshold (from {len(sorted_ids)} total)")
-        
-        # 5. Build SourceEvidence objects
+        logger.info(f"Hybrid: {len(filtered_ids)} docs above {FUSION_THRESHOLD} threshold (from {len(sorted_ids)} total)")
+        return filtered_ids
+    
+    def _build_sources(self, hits: List[Tuple[str, float]], doc_data: Dict[str, Dict]) -> List[SourceEvidence]:
+        """Build SourceEvidence objects for ranked chunk hits"""
         sources = []
-        for doc_id, score in filtered_ids:
-            # Get metadata
-            if doc_id in semantic_data:
-                metadata = semantic_data[doc_id]['metadata']
-                document = semantic_data[doc_id]['document']
+        for doc_id, score in hits:
+            if doc_id in doc_data:
+                metadata = doc_data[doc_id]['metadata']
+                document = doc_data[doc_id]['document']
             else:
-                # From BM25 only
-                idx = self.bm25_ids.index(doc_id)
-                metadata = self.bm25_metadatas[idx]
-                document = self.bm25_docs[idx]
+                # From BM25 only: O(1) row lookup in the document store
+                row = self.doc_store.row(doc_id)
+                if row < 0:
+                    continue
+                metadata = self.doc_store.get_metadata(row)
+                document = self.doc_store.get_text(row)
             
-            paper_id = doc_id.split('_chunk_')[0] if '_chunk_' in doc_id else doc_id
+            paper_id = paper_id_of(doc_id)
             title = metadata.get('title', paper_id.replace('_', ' ').title())
             
             source = SourceEvidence(
@@ -215,7 +500,8 @@ class RAGPipeline:
                 relevance_score=float(score),
                 chunk_text=document[:500] + "..." if len(document) > 500 else document,
                 source=metadata.get('source', 'unknown'),
-                metadata=metadata
+                metadata=metadata,
+                context_text=document
             )
             sources.append(source)
         
@@ -244,16 +530,10 @@ class RAGPipeline:
         """Filter by date"""
         filtered = []
         for source in sources:
-            pub_date = source.metadata.get('publication_date', '')
-            if not pub_date:
-                continue
-            
-            year_match = re.search(r'\b(19|20)\d{2}\b', str(pub_date))
-            if not year_match:
+            year = extract_year(source.metadata.get('publication_date', ''))
+            if year is None:
                 continue
             
-            year = int(year_match.group(0))
-            
             if date_range.start_date:
                 start_year = int(date_range.start_date[:4])
                 if year < start_year:
@@ -269,49 +549,33 @@ class RAGPipeline:
         return filtered
 
     def _filter_by_mesh_terms(self, sources: List[SourceEvidence], mesh_terms: List[str]) -> List[SourceEvidence]:
-        """Filter by MeSH"""
+        """Filter by MeSH (exact term match, same parsing as the facet index)"""
         filtered = []
-        mesh_lower = [m.lower() for m in mesh_terms]
+        wanted = {normalize_mesh_term(m) for m in mesh_terms}
         
         for source in sources:
-            source_mesh = source.metadata.get('mesh_terms', [])
-            if not source_mesh:
-                continue
-            
-            source_mesh_str = str(source_mesh).lower()
-            
-            if any(mesh in source_mesh_str for mesh in mesh_lower):
+            source_mesh = parse_mesh_terms(source.metadata.get('mesh_terms', []))
+            if wanted.intersection(source_mesh):
                 filtered.append(source)
         
         return filtered
     
-    def build_rag_context(self, sources: List[SourceEvidence], max_length: int = 2048) -> str:
-        """Build context"""
-        context_parts = []
-        current_length = 0
-        
-        for idx, source in enumerate(sources, 1):
-            chunk_text = f"[Source {idx} - {source.title[:80]}]\n{source.chunk_text}\n"
-            chunk_length = len(chunk_text.split())
-            
-            if current_length + chunk_length > max_length:
-                break
-            
-            context_parts.append(chunk_text)
-            current_length += chunk_length
-        
-        context = "\n".join(context_parts)
-        logger.info(f"Built context: {current_length} words from {len(context_parts)} sources")
-        return context
-        
+    async def build_rag_context(self, query: str, sources: List[SourceEvidence], max_tokens: int = 1500) -> str:
+        """Build context: query-relevant sentences packed into max_tokens LLM tokens
+        
+        Token counting is CPU-bound, so it runs on the retrieval executor.
+        """
+        with timed("context"):
+            loop = asyncio.get_running_loop()
+            # Run in a copy of this context so the builder's span attributes reach the trace
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                self.executor,
+                functools.partial(context.run, self.context_builder.build, query, sources, max_tokens)
+            )
 
-    async def generate_answer(
-        self,
-        query: str,
-        context: str,
-        temperature: float = 0.3
-    ) -> str:
-        """Generate concise, well-formatted answer"""
+    def build_answer_prompts(self, query: str, context: str) -> Tuple[str, str]:
+        """Build (system_prompt, user_prompt) for answer generation"""
         
         system_prompt = """You are a medical research assistant. Provide CONCISE answers in this format:
 
@@ -342,57 +606,122 @@ class RAGPipeline:
 
     Answer:"""
         
+        return system_prompt, user_prompt
+
+    async def generate_answer(
+        self,
+        query: str,
+        context: str,
+        temperature: float = 0.3
+    ) -> str:
+        """Generate concise, well-formatted answer"""
+        system_prompt, user_prompt = self.build_answer_prompts(query, context)
+        
         try:
-            answer = await self.llm_client.generate(
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                max_tokens=700,
-                temperature=temperature
-            )
+            with timed("llm_answer"):
+                answer = await self.llm_client.generate(
+                    prompt=user_prompt,
+                    system_prompt=system_prompt,
+                    max_tokens=700,
+                    temperature=temperature
+                )
             return answer.strip()
         except Exception as e:
             logger.error(f"Error generating answer: {e}")
             raise
 
+    async def generate_answer_stream(
+        self,
+        query: str,
+        context: str,
+        temperature: float = 0.3
+    ) -> AsyncIterator[str]:
+        """Stream answer tokens as the LLM produces them"""
+        system_prompt, user_prompt = self.build_answer_prompts(query, context)
+        
+        try:
+            with timed("llm_answer"):
+                async for delta in self.llm_client.generate_stream(
+                    prompt=user_prompt,
+                    system_prompt=system_prompt,
+                    max_tokens=700,
+                    temperature=temperature
+                ):
+                    yield delta
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            raise
 
+    @traced("retrieve")
+    async def retrieve(
+        self,
+        request: SearchRequest,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[SourceEvidence], Optional[str]]:
+        """Retrieve and filter sources.
+        
+        Returns (sources, fallback_answer); fallback_answer is set when no
+        LLM answer should be generated for these sources. A precomputed
+        query_embedding skips the embedding stage.
+        """
+        # Push filters down into both retrieval branches when the facet
+        # index is available; otherwise post-filter as before
+        retrieval_filter = None
+        if request.filters and self.facets is not None:
+            with timed("filter"):
+                retrieval_filter = compile_filters(request.filters, self.facets)
+        
+        # Hybrid search (embedding, BM25 and ChromaDB run off the event loop)
+        sources = await self.hybrid_search(
+            query=request.query,
+            query_embedding=query_embedding,
+            top_k=request.top_k,
+            retrieval_filter=retrieval_filter
+        )
+        
+        if not sources:
+            return [], "No relevant information found."
+        
+        # Check top score (the pooled paper score when collapsing)
+        top_score = sources[0].relevance_score
+        if top_score < 0.4:
+            return sources[:3], f"No highly relevant sources found. Best match: {top_score:.2f}. Try different terms."
+        
+        # Apply filters
+        if request.filters and self.facets is None:
+            with timed("filter"):
+                sources = self.apply_filters(sources, request.filters)
+        
+        return sources, None
     
+    @traced("rag_search")
     async def search(self, request: SearchRequest) -> Tuple[str, List[SourceEvidence]]:
         """Execute RAG search with hybrid retrieval"""
         logger.info(f"Search: {request.query}")
         
         try:
-            query_embedding = self.generate_query_embedding(request.query)
-            
-            # Hybrid search
-            sources = self.hybrid_search(
-                query=request.query,
-                query_embedding=query_embedding,
-                top_k=request.top_k
-            )
-            
-            if not sources:
-                return "No relevant information found.", []
-            
-            # Check top score
-            top_score = sources[0].relevance_score
-            if top_score < 0.4:
-                return f"No highly relevant sources found. Best match: {top_score:.2f}. Try different terms.", sources[:3]
-            
-            # Apply filters
-            if request.filters:
-                sources = self.apply_filters(sources, request.filters)
+            sources, fallback_answer = await self.retrieve(request)
+            if fallback_answer is not None:
+                return fallback_answer, sources
             
             # Generate answer
-            context = self.build_rag_context(sources, settings.MAX_CONTEXT_LENGTH)
+            context = await self.build_rag_context(request.query, sources, settings.MAX_CONTEXT_TOKENS)
             answer = await self.generate_answer(
                 query=request.query,
                 context=context,
                 temperature=0.3
             )
             
-            logger.info(f"Complete: {len(sources)} sources, top: {top_score:.3f}")
+            logger.info(f"Complete: {len(sources)} sources, top: {sources[0].relevance_score if sources else 0:.3f}")
             return answer, sources
             
         except Exception as e:
             logger.error(f"Search error: {e}")
             raise
+
+def _restart_pipelines_after_fork():
+    for pipeline in list(_live_pipelines):
+        pipeline._reconnect_chroma_after_fork()
+        pipeline._start_workers()
+
+os.register_at_fork(after_in_child=_restart_pipelines_after_fork)
@@ -0,0 +1,311 @@
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+import json
+import logging
+import numpy as np
+
+from app.services.rag.storage import StringTable, build_lock, publish_directory, staging_directory
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout or scoring parameters change
+FORMAT_VERSION = 2
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize text for BM25 (shared by indexing and querying)"""
+    return text.lower().split()
+
+class SparseIndex:
+    """Persistent BM25 inverted index opened via memory maps.
+
+    Built once from the corpus and shared by every worker through the OS
+    page cache. Scores match rank_bm25.BM25Okapi for the same tokenization
+    and parameters.
+
+    Directory layout:
+        meta.json             format version, corpus fingerprint, BM25 params
+        terms.bin             vocabulary, sorted by UTF-8 bytes
+        terms_offsets.npy
+        idf.npy               IDF per term (float64)
+        max_scores.npy        highest BM25 contribution per term, for pruning
+        postings_offsets.npy  start of each term's postings (V + 1)
+        postings_docs.npy     document rows per term, ascending (int32)
+        postings_tfs.npy      term frequency per posting (int32)
+        doc_lengths.npy       tokens per document (int32)
+        ids.bin               ChromaDB id per document row
+        ids_offsets.npy
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / "meta.json") as f:
+            self.meta = json.load(f)
+
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Sparse index version {self.meta.get('version')} != {FORMAT_VERSION}"
+            )
+
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+        self.avgdl = self.meta["avgdl"]
+        self.num_docs = self.meta["num_docs"]
+
+        self.terms = StringTable.open(self.path, "terms")
+        self.ids = StringTable.open(self.path, "ids")
+        self.idf = np.load(self.path / "idf.npy", mmap_mode="r")
+        self.max_scores = np.load(self.path / "max_scores.npy", mmap_mode="r")
+        self.postings_offsets = np.load(self.path / "postings_offsets.npy", mmap_mode="r")
+        self.postings_docs = np.load(self.path / "postings_docs.npy", mmap_mode="r")
+        self.postings_tfs = np.load(self.path / "postings_tfs.npy", mmap_mode="r")
+        self.doc_lengths = np.load(self.path / "doc_lengths.npy", mmap_mode="r")
+
+    @property
+    def fingerprint(self) -> Dict:
+        return self.meta.get("fingerprint", {})
+
+    def doc_id(self, row: int) -> str:
+        """ChromaDB id of a document row"""
+        return self.ids.get(row)
+
+    def term_id(self, term: str) -> int:
+        return self.terms.find(term)
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(document rows, term frequencies) for a term"""
+        start = self.postings_offsets[term_id]
+        end = self.postings_offsets[term_id + 1]
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    def term_scores(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(document rows, BM25 contribution) for a term"""
+        docs, tfs = self.postings(term_id)
+        return docs, self._contribution(term_id, docs, tfs)
+
+    def _contribution(self, term_id: int, docs: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        tfs = tfs.astype(np.float64)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avgdl)
+        return self.idf[term_id] * (tfs * (self.k1 + 1) / (tfs + norm))
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """BM25 score of every document (same contract as BM25Okapi.get_scores)"""
+        scores = np.zeros(self.num_docs)
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id < 0:
+                continue
+            docs, contribution = self.term_scores(term_id)
+            scores[docs] += contribution
+        return scores
+
+    def top_k(
+        self,
+        query_tokens: List[str],
+        k: int,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """Top-k (row, score) with positive BM25 score, best first.
+
+        Term-at-a-time MaxScore: terms are visited in descending order of
+        their score upper bound. Once the bounds of the remaining terms
+        cannot lift an unseen document past the current k-th best partial
+        score, no new candidates are admitted; remaining terms only update
+        existing candidates via binary search into their postings, and
+        candidates that can no longer reach the top-k are dropped. Work
+        follows posting-list length, not corpus size. Scores are identical
+        to get_scores(). If `allowed` (bool per row) is given, only those
+        rows are scored, so every returned slot satisfies it.
+        """
+        weights = Counter(
+            term_id for term_id in map(self.term_id, query_tokens) if term_id >= 0
+        )
+        if not weights or k <= 0:
+            return []
+
+        upper = {t: w * float(self.max_scores[t]) for t, w in weights.items()}
+        terms = sorted(weights, key=upper.__getitem__, reverse=True)
+        remaining = np.cumsum([upper[t] for t in reversed(terms)])[::-1]
+        # Bounds only hold for non-negative contributions
+        prunable = all(self.idf[t] >= 0 for t in terms)
+
+        cand_docs = np.zeros(0, dtype=np.int32)
+        cand_scores = np.zeros(0)
+
+        for i, term_id in enumerate(terms):
+            threshold = _kth_largest(cand_scores, k) if prunable else -np.inf
+            docs, tfs = self.postings(term_id)
+            if allowed is not None:
+                keep = allowed[docs]
+                docs, tfs = docs[keep], tfs[keep]
+
+            if remaining[i] > threshold:
+                # Unseen documents can still make the top-k: merge postings
+                contribution = self._contribution(term_id, docs, tfs) * weights[term_id]
+                if len(cand_docs) + len(docs) > self.num_docs // 8:
+                    # Dense scatter is cheaper than a sort-based union here
+                    accumulator = np.zeros(self.num_docs)
+                    accumulator[cand_docs] = cand_scores
+                    accumulator[docs] += contribution
+                    cand_docs = np.flatnonzero(accumulator).astype(np.int32)
+                    cand_scores = accumulator[cand_docs]
+                else:
+                    all_docs = np.concatenate([cand_docs, docs])
+                    all_scores = np.concatenate([cand_scores, contribution])
+                    cand_docs, inverse = np.unique(all_docs, return_inverse=True)
+                    cand_scores = np.bincount(inverse, weights=all_scores, minlength=len(cand_docs))
+                continue
+
+            # Drop candidates that cannot reach the threshold, score the rest
+            keep = cand_scores + remaining[i] >= threshold
+            cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+            if len(docs) == 0 or len(cand_docs) == 0:
+                continue
+            positions = np.minimum(np.searchsorted(docs, cand_docs), len(docs) - 1)
+            hit = docs[positions] == cand_docs
+            if hit.any():
+                matched = positions[hit]
+                cand_scores[hit] += self._contribution(
+                    term_id, docs[matched], tfs[matched]
+                ) * weights[term_id]
+
+        positive = cand_scores > 0
+        cand_docs, cand_scores = cand_docs[positive], cand_scores[positive]
+        if len(cand_scores) > k:
+            selected = np.argpartition(-cand_scores, k - 1)[:k]
+            cand_docs, cand_scores = cand_docs[selected], cand_scores[selected]
+        order = np.argsort(-cand_scores, kind="stable")
+        return [(int(cand_docs[j]), float(cand_scores[j])) for j in order]
+
+    @classmethod
+    def build(
+        cls,
+        path: Path,
+        documents: Iterable[Tuple[str, str]],
+        fingerprint: Dict,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25
+    ) -> "SparseIndex":
+        """Build an index from (id, text) pairs and atomically publish it at path"""
+        path = Path(path)
+        vocab: Dict[str, int] = {}
+        term_col, row_col, tf_col = array("i"), array("i"), array("i")
+        doc_lengths = array("i")
+        ids: List[bytes] = []
+
+        for row, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text or "")
+            ids.append(doc_id.encode("utf-8"))
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                row_col.append(row)
+                tf_col.append(tf)
+
+        num_docs = len(ids)
+
+        # Renumber terms in byte order so lookups can binary search
+        encoded = [term.encode("utf-8") for term in vocab]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        remap = np.empty(len(encoded), dtype=np.int64)
+        remap[order] = np.arange(len(encoded))
+
+        term_ids = remap[np.frombuffer(term_col, dtype=np.int32)] if term_col else np.zeros(0, dtype=np.int64)
+        permutation = np.argsort(term_ids, kind="stable")
+        postings_docs = np.frombuffer(row_col, dtype=np.int32)[permutation] if row_col else np.zeros(0, dtype=np.int32)
+        postings_tfs = np.frombuffer(tf_col, dtype=np.int32)[permutation] if tf_col else np.zeros(0, dtype=np.int32)
+
+        df = np.bincount(term_ids, minlength=len(encoded))
+        postings_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(df, out=postings_offsets[1:])
+
+        # IDF exactly as rank_bm25.BM25Okapi._calc_idf
+        idf = np.log(num_docs - df + 0.5) - np.log(df + 0.5)
+        average_idf = idf.sum() / len(idf) if len(idf) else 0.0
+        idf[idf < 0] = epsilon * average_idf
+
+        lengths = np.frombuffer(doc_lengths, dtype=np.int32) if doc_lengths else np.zeros(0, dtype=np.int32)
+        avgdl = float(lengths.sum()) / num_docs if num_docs else 0.0
+
+        # Per-term upper bound of the BM25 contribution, used by top_k()
+        max_scores = np.zeros(len(encoded))
+        if len(postings_docs):
+            posting_terms = np.repeat(np.arange(len(encoded)), df)
+            tfs = postings_tfs.astype(np.float64)
+            norm = k1 * (1 - b + b * lengths[postings_docs] / avgdl)
+            contribution = idf[posting_terms] * (tfs * (k1 + 1) / (tfs + norm))
+            max_scores = np.maximum.reduceat(contribution, postings_offsets[:-1])
+
+        tmp_path = staging_directory(path)
+
+        StringTable.write(tmp_path, "terms", [encoded[i] for i in order])
+        StringTable.write(tmp_path, "ids", ids)
+        np.save(tmp_path / "idf.npy", idf.astype(np.float64))
+        np.save(tmp_path / "max_scores.npy", max_scores)
+        np.save(tmp_path / "postings_offsets.npy", postings_offsets)
+        np.save(tmp_path / "postings_docs.npy", postings_docs)
+        np.save(tmp_path / "postings_tfs.npy", postings_tfs)
+        np.save(tmp_path / "doc_lengths.npy", lengths)
+        with open(tmp_path / "meta.json", "w") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "fingerprint": fingerprint,
+                "num_docs": num_docs,
+                "num_terms": len(encoded),
+                "num_postings": int(len(postings_docs)),
+                "avgdl": avgdl,
+                "k1": k1,
+                "b": b,
+                "epsilon": epsilon
+            }, f, indent=2)
+
+        publish_directory(tmp_path, path)
+        logger.info(f"Sparse index built: {num_docs} docs, {len(encoded)} terms at {path}")
+        return cls(path)
+
+    @classmethod
+    def open_or_build(
+        cls,
+        path: Path,
+        fingerprint: Dict,
+        documents: Callable[[], Iterable[Tuple[str, str]]]
+    ) -> "SparseIndex":
+        """Open the index at path, rebuilding it if missing, outdated or stale.
+
+        Builds are serialized with a file lock so concurrent workers build
+        once and the rest open the result.
+        """
+        path = Path(path)
+        index = cls._try_open(path, fingerprint)
+        if index is not None:
+            return index
+
+        with build_lock(path):
+            index = cls._try_open(path, fingerprint)
+            if index is not None:
+                return index
+            logger.info(f"Building sparse index at {path}...")
+            return cls.build(path, documents(), fingerprint)
+
+    @classmethod
+    def _try_open(cls, path: Path, fingerprint: Dict) -> Optional["SparseIndex"]:
+        if not (path / "meta.json").exists():
+            return None
+        try:
+            index = cls(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable sparse index at {path}: {e}")
+            return None
+        if index.fingerprint != fingerprint:
+            logger.info(f"Sparse index at {path} is stale: {index.fingerprint} != {fingerprint}")
+            return None
+        logger.info(f"Opened sparse index: {index.num_docs} docs from {path}")
+        return index
+
+def _kth_largest(values: np.ndarray, k: int) -> float:
+    """k-th largest value, or 0 while fewer than k values exist"""
+    if len(values) < k:
+        return 0.0
+    return float(np.partition(values, len(values) - k)[len(values) - k])
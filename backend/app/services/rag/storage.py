@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+import fcntl
+import os
+import shutil
+import numpy as np
+
+class StringTable:
+    """Read-only table of UTF-8 strings stored as one blob plus offsets"""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_bytes(self, i: int) -> bytes:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def get(self, i: int) -> str:
+        return self.get_bytes(i).decode("utf-8")
+
+    def find(self, value: str) -> int:
+        """Binary search a table written in sorted order; -1 if absent"""
+        key = value.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self.get_bytes(mid)
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    @staticmethod
+    def write(path: Path, name: str, values: List[bytes]):
+        """Write encoded strings as <name>.bin and <name>_offsets.npy"""
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        with open(path / f"{name}.bin", "wb") as f:
+            position = 0
+            for i, value in enumerate(values):
+                f.write(value)
+                position += len(value)
+                offsets[i + 1] = position
+        np.save(path / f"{name}_offsets.npy", offsets)
+
+    @classmethod
+    def open(cls, path: Path, name: str) -> "StringTable":
+        offsets = np.load(path / f"{name}_offsets.npy", mmap_mode="r")
+        data_path = path / f"{name}.bin"
+        if data_path.stat().st_size == 0:
+            data = np.zeros(0, dtype=np.uint8)
+        else:
+            data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        return cls(data, offsets)
+
+def staging_directory(path: Path) -> Path:
+    """Create an empty private directory next to path to build into"""
+    tmp_path = path.parent / f".{path.name}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    return tmp_path
+
+def publish_directory(tmp_path: Path, path: Path):
+    """Swap a freshly written directory into place.
+
+    Processes that already mapped files from the old directory keep
+    reading them until they close; new opens see the new version.
+    """
+    old_path = path.parent / f".{path.name}.old-{os.getpid()}"
+    if path.exists():
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+@contextmanager
+def build_lock(path: Path) -> Iterator[None]:
+    """Serialize builds of path across processes with an advisory file lock"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.parent / f".{path.name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
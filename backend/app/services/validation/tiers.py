@@ -0,0 +1,123 @@
+from app.models.schemas import MultiAgentValidation, SourceEvidence, ValidationTier
+from app.services.agents.multi_agent_system import MultiAgentValidator as HeuristicValidator
+from app.services.validation.validators import MultiAgentValidator as LLMValidator, validation_failed
+from app.core.metrics import timed
+from app.core.tracing import set_attributes
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TieredValidator:
+    """Dispatches validation to the tier a request asks for.
+
+    - none: no validation
+    - heuristic: score-based checks, no LLM calls
+    - llm: the LLM agents, however long they take
+    - auto: the heuristic verdict right away; the LLM verdict is attached
+      separately if all agents succeed within the budget. Otherwise the LLM
+      run is left to finish in the background so its agent results are
+      cached for the next identical answer
+    """
+
+    def __init__(self):
+        self.heuristic = HeuristicValidator()
+        self._llm: Optional[LLMValidator] = None
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def llm(self) -> LLMValidator:
+        # Created on first use so heuristic-only deployments never build a Groq client
+        if self._llm is None:
+            self._llm = LLMValidator()
+        return self._llm
+
+    async def validate(
+        self,
+        tier: ValidationTier,
+        query: str,
+        answer: str,
+        sources: List[SourceEvidence],
+        budget_ms: Optional[int] = None
+    ) -> Tuple[Optional[MultiAgentValidation], Optional[ValidationTier], Optional[MultiAgentValidation]]:
+        """(validation, tier that produced it, attached LLM validation)"""
+        validation, produced, llm_validation = None, None, None
+        async for stage, verdict, verdict_tier in self.validate_stages(tier, query, answer, sources, budget_ms):
+            if stage == "validation":
+                validation, produced = verdict, verdict_tier
+            else:
+                llm_validation = verdict
+        return validation, produced, llm_validation
+
+    async def validate_stages(
+        self,
+        tier: ValidationTier,
+        query: str,
+        answer: str,
+        sources: List[SourceEvidence],
+        budget_ms: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, MultiAgentValidation, ValidationTier]]:
+        """Yield ("validation", verdict, tier) as soon as it is ready, then, in
+        auto, ("llm_validation", verdict, llm) if the LLM verdict arrives
+        within budget_ms of the start"""
+        if tier == ValidationTier.NONE:
+            return
+
+        llm_task = None
+        if tier == ValidationTier.AUTO:
+            # Started first so the LLM agents overlap the heuristic pass
+            llm_task = asyncio.create_task(self.llm.validate(answer, sources))
+            deadline = asyncio.get_running_loop().time() + (budget_ms or 0) / 1000
+        try:
+            with timed("validation", requested_tier=tier.value, budget_ms=budget_ms):
+                validation, produced = await self._validate(tier, query, answer, sources)
+                set_attributes(tier=produced.value)
+            yield "validation", validation, produced
+
+            if llm_task is not None:
+                with timed("llm_validation", budget_ms=budget_ms):
+                    llm_validation = await self._await_llm(llm_task, deadline, budget_ms)
+                    set_attributes(attached=llm_validation is not None)
+                if llm_validation is not None:
+                    yield "llm_validation", llm_validation, ValidationTier.LLM
+        finally:
+            if llm_task is not None and not llm_task.done():
+                # Caller left early or the budget ran out: finish in the background
+                self._background.add(llm_task)
+                llm_task.add_done_callback(self._finish_background)
+
+    async def _validate(
+        self,
+        tier: ValidationTier,
+        query: str,
+        answer: str,
+        sources: List[SourceEvidence]
+    ) -> Tuple[MultiAgentValidation, ValidationTier]:
+        if tier == ValidationTier.LLM:
+            return await self.llm.validate(answer, sources), tier
+        # heuristic, and auto's immediate verdict
+        heuristic = await self.heuristic.validate(query=query, answer=answer, sources=sources)
+        return heuristic, ValidationTier.HEURISTIC
+
+    async def _await_llm(
+        self,
+        llm_task: asyncio.Task,
+        deadline: float,
+        budget_ms: Optional[int]
+    ) -> Optional[MultiAgentValidation]:
+        """The LLM verdict if it succeeds by the deadline, else None"""
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        done, _ = await asyncio.wait({llm_task}, timeout=timeout)
+        if llm_task not in done:
+            logger.info(f"LLM validation exceeded {budget_ms}ms budget; not attached")
+            return None
+        if llm_task.exception() is not None or validation_failed(llm_task.result()):
+            logger.info("LLM validation failed within budget; not attached")
+            return None
+        return llm_task.result()
+
+    def _finish_background(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background LLM validation failed: {task.exception()}")
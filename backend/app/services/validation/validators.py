@@ -1,6 +1,9 @@
 from app.agents.clinical_expert import ClinicalExpertAgent
 from app.agents.statistical_validator import StatisticalValidatorAgent
 from app.agents.contradiction_detector import ContradictionDetectorAgent
+from app.agents.fused_validator import FusedValidatorAgent
+from app.core.config import settings
+from app.core.metrics import ERRORS, timed_agent
 from app.models.schemas import MultiAgentValidation, SourceEvidence
 import asyncio
 import logging
@@ -8,6 +11,18 @@ from typing import List
 
 logger = logging.getLogger(__name__)
 
+# Flags set on placeholder verdicts: "validation_error" by an agent whose
+# LLM call failed, "error" when the whole validation run did
+FAILURE_FLAGS = ("error", "validation_error")
+
+def validation_failed(validation: MultiAgentValidation) -> bool:
+    """Whether any agent's verdict is a placeholder rather than a real assessment"""
+    return any(
+        flag in FAILURE_FLAGS
+        for agent in (validation.clinical_expert, validation.statistical_validator, validation.contradiction_detector)
+        for flag in agent.flags
+    )
+
 class MultiAgentValidator:
     """Orchestrates multi-agent validation"""
     
@@ -15,11 +30,12 @@ class MultiAgentValidator:
         self.clinical_expert = ClinicalExpertAgent()
         self.statistical_validator = StatisticalValidatorAgent()
         self.contradiction_detector = ContradictionDetectorAgent()
+        self.fused_validator = FusedValidatorAgent()
     
     async def validate(self, answer: str, sources: List[SourceEvidence]) -> MultiAgentValidation:
-        """Run all validation agents in parallel"""
+        """Run the validation agents (one fused call or three in parallel)"""
         
-        logger.info("Starting multi-agent validation")
+        logger.info(f"Starting multi-agent validation ({settings.VALIDATION_MODE})")
         
         # Convert sources to dict format for agents
         source_dicts = [
@@ -32,12 +48,20 @@ class MultiAgentValidator:
         ]
         
         try:
-            # Run all agents in parallel
-            clinical, statistical, contradiction = await asyncio.gather(
-                self.clinical_expert.validate(answer, source_dicts),
-                self.statistical_validator.validate(answer, source_dicts),
-                self.contradiction_detector.validate(answer, source_dicts)
-            )
+            if settings.VALIDATION_MODE == "fused":
+                try:
+                    clinical, statistical, contradiction = await self._run_agent(
+                        self.fused_validator, answer, source_dicts
+                    )
+                except Exception as e:
+                    logger.warning(f"Fused validation failed, falling back to per-agent calls: {e}")
+                    clinical, statistical, contradiction = await self._validate_per_agent(
+                        answer, source_dicts
+                    )
+            else:
+                clinical, statistical, contradiction = await self._validate_per_agent(
+                    answer, source_dicts
+                )
             
             # Calculate overall confidence
             overall_confidence = (
@@ -57,6 +81,7 @@ class MultiAgentValidator:
             
         except Exception as e:
             logger.error(f"Validation error: {e}")
+            ERRORS.labels("validation").inc()
             # Return default scores on error
             from app.models.schemas import ClinicalValidation, StatisticalValidation, ContradictionAnalysis
             
@@ -84,3 +109,15 @@ class MultiAgentValidator:
                 ),
                 overall_confidence=0.5
             )
+    
+    async def _validate_per_agent(self, answer: str, source_dicts: List[dict]):
+        """Run all agents in parallel, one LLM call each"""
+        return await asyncio.gather(
+            self._run_agent(self.clinical_expert, answer, source_dicts),
+            self._run_agent(self.statistical_validator, answer, source_dicts),
+            self._run_agent(self.contradiction_detector, answer, source_dicts)
+        )
+    
+    async def _run_agent(self, agent, answer: str, source_dicts: List[dict]):
+        with timed_agent(agent.name):
+            return await agent.validate(answer, source_dicts)
@@ -0,0 +1,193 @@
+"""Local OpenAI/Groq-compatible chat completions stub for load tests.
+
+    python -m benchmarks.fake_llm --port 8101 --latency-ms 300 --tokens-per-second 400
+
+Point the backend at it with GROQ_BASE_URL=http://127.0.0.1:8101. Serves
+`/openai/v1/chat/completions` (the Groq SDK path) and
+`/v1/chat/completions`, streaming or not. Each completion waits
+`latency_ms` (plus jitter) before the first token and then emits tokens
+at `tokens_per_second`. A fraction of requests fails with a 500 or a
+429 so retry paths are exercised. JSON-mode requests get a reply in the
+fused validator's schema.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import AsyncIterator, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER_WORDS = (
+    "Current evidence from randomized trials and cohort studies suggests a moderate benefit [Source 1], "
+    "although effect sizes vary with baseline risk and follow-up duration [Source 2]. "
+    "Adverse events were uncommon and mostly mild [Source 3]. "
+    "Further research is needed in older and multimorbid populations."
+).split()
+
+FUSED_REPLY = {
+    "clinical": {
+        "confidence": 0.8, "clinical_relevance": 0.8,
+        "safety_concerns": [], "reasoning": "Answer is consistent with the cited sources."
+    },
+    "statistical": {
+        "confidence": 0.7, "statistical_score": 0.7,
+        "methodology_notes": "Mix of randomized and observational evidence.", "reasoning": "Adequate sample sizes."
+    },
+    "contradiction": {
+        "confidence": 0.8, "contradiction_level": "low",
+        "conflicting_sources": [], "reasoning": "Sources broadly agree."
+    }
+}
+
+class FakeLLMConfig:
+    """Latency, throughput and failure behaviour of the stub"""
+
+    def __init__(
+        self,
+        latency_ms: float = 300,
+        jitter_ms: float = 50,
+        tokens_per_second: float = 400,
+        completion_tokens: int = 150,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+
+def create_app(config: FakeLLMConfig) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    stats = {"requests": 0, "streams": 0, "errors": 0, "rate_limited": 0, "tokens": 0}
+
+    def completion_tokens(body: dict) -> List[str]:
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            return [json.dumps(FUSED_REPLY)]
+        count = min(body.get("max_tokens") or config.completion_tokens, config.completion_tokens)
+        return [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(count)]
+
+    async def first_token_delay():
+        jitter = config.random.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(0.0, config.latency_ms + jitter) / 1000)
+
+    def generation_seconds(tokens: int) -> float:
+        return tokens / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+    def injected_failure():
+        roll = config.random.random()
+        if roll < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}}, status_code=500)
+        if roll < config.error_rate + config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": "1"}
+            )
+        return None
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        failure = injected_failure()
+        if failure is not None:
+            return failure
+
+        tokens = completion_tokens(body)
+        stats["tokens"] += len(tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", [])),
+            "completion_tokens": len(tokens)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            await first_token_delay()
+            await asyncio.sleep(generation_seconds(len(tokens)))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        stats["streams"] += 1
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream() -> AsyncIterator[str]:
+            await first_token_delay()
+            yield chunk({"role": "assistant", "content": ""})
+            # Flush a few tokens per frame, as real servers do
+            step = 4
+            for i in range(0, len(tokens), step):
+                batch = tokens[i:i + step]
+                await asyncio.sleep(generation_seconds(len(batch)))
+                yield chunk({"content": "".join(batch)})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI/Groq-compatible LLM stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--tokens-per-second", type=float, default=400, help="0 = instant")
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with HTTP 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""End-to-end load test against a local fake LLM.
+
+    python -m benchmarks.load_test --concurrency 1,4,16,32 --duration 30 --llm-latency-ms 400
+
+Starts the fake LLM server (benchmarks/fake_llm.py) and one uvicorn
+worker of the app pointed at it (GROQ_BASE_URL), waits for /ready, then
+drives a weighted mix of search, history and citation requests at each
+concurrency level in turn. For every level it reports throughput,
+p50/p95/p99 latency and errors per endpoint, plus the worker's
+event-loop lag sampled by the app itself (/loop-lag).
+
+History and citation requests need MongoDB (a throwaway user is
+registered); without it only search is exercised. Citation requests
+reference sources of the user's saved searches ("search_id:paper_id").
+Response and agent caches are disabled unless --keep-caches is given,
+so repeated queries measure the real work. Use --url to target an
+already running app instead (its GROQ_BASE_URL must then point at a
+fake LLM you started, and loop lag is only reported if it runs with
+LOOP_LAG_MONITOR=true).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger("benchmarks.load_test")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_QUERIES = Path(__file__).with_name("queries.jsonl")
+ENDPOINTS = ("search", "history", "citations")
+
+class LoadTest:
+    """Closed-loop load generator: each virtual user sends its next request when the last one returns"""
+
+    def __init__(self, client: httpx.AsyncClient, queries: List[str], mix: Dict[str, float], validation: str, seed: int):
+        self.client = client
+        self.queries = queries
+        self.mix = mix
+        self.validation = validation
+        self.random = random.Random(seed)
+        self.headers: Dict[str, str] = {}
+        # "search_id:paper_id" references, the form /citations resolves
+        self.citation_ids: List[str] = []
+
+    async def login(self) -> bool:
+        """Register a throwaway user; False when auth (MongoDB) is unavailable"""
+        email = f"loadtest-{uuid.uuid4().hex[:12]}@example.com"
+        password = uuid.uuid4().hex
+        try:
+            response = await self.client.post(
+                "/api/v1/auth/register",
+                json={"email": email, "password": password, "full_name": "Load Test"}
+            )
+            response.raise_for_status()
+            response = await self.client.post("/api/v1/auth/login", json={"email": email, "password": password})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Login failed ({e}); history and citations are skipped")
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def request(self, endpoint: str) -> bool:
+        if endpoint == "search":
+            response = await self.client.post(
+                "/api/v1/medical/search",
+                json={"query": self.random.choice(self.queries), "validation": self.validation},
+                headers=self.headers
+            )
+            if response.status_code == 200:
+                self.remember_citations(response.json())
+        elif endpoint == "history":
+            response = await self.client.get("/api/v1/history/", params={"limit": 20}, headers=self.headers)
+        else:
+            paper_ids = self.random.sample(self.citation_ids, min(5, len(self.citation_ids)))
+            response = await self.client.post(
+                "/api/v1/citations/",
+                json={"paper_ids": paper_ids, "format": "bibtex"},
+                headers=self.headers
+            )
+        return response.status_code < 400
+
+    def remember_citations(self, result: dict):
+        """Keep a bounded pool of citable references from a saved search"""
+        search_id = result.get("search_id")
+        if search_id:
+            references = [f"{search_id}:{source['paper_id']}" for source in result.get("sources", [])]
+            self.citation_ids = (self.citation_ids + references)[-200:]
+
+    async def prime_citations(self) -> bool:
+        """Run searches until a saved one yields citable references; False if none does"""
+        for query in self.queries[:5]:
+            response = await self.client.post(
+                "/api/v1/medical/search",
+                json={"query": query, "validation": self.validation},
+                headers=self.headers
+            )
+            if response.status_code == 200:
+                self.remember_citations(response.json())
+            if self.citation_ids:
+                return True
+        return False
+
+    async def run_level(self, concurrency: int, duration: float) -> Dict[str, List[Tuple[float, bool]]]:
+        samples: Dict[str, List[Tuple[float, bool]]] = {endpoint: [] for endpoint in self.mix}
+        endpoints = list(self.mix)
+        weights = [self.mix[endpoint] for endpoint in endpoints]
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                endpoint = self.random.choices(endpoints, weights)[0]
+                started = time.perf_counter()
+                try:
+                    ok = await self.request(endpoint)
+                except httpx.HTTPError:
+                    ok = False
+                samples[endpoint].append((time.perf_counter() - started, ok))
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return samples
+
+def summarize(samples: List[Tuple[float, bool]], elapsed: float) -> dict:
+    if not samples:
+        return {"requests": 0}
+    latencies = np.array([seconds for seconds, _ in samples]) * 1000
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1)
+    }
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {endpoint!r}; expected one of {ENDPOINTS}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+def start_fake_llm(args) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.fake_llm",
+        "--port", str(args.llm_port),
+        "--latency-ms", str(args.llm_latency_ms),
+        "--tokens-per-second", str(args.llm_tokens_per_second),
+        "--completion-tokens", str(args.llm_completion_tokens),
+        "--error-rate", str(args.llm_error_rate),
+        "--rate-limit-rate", str(args.llm_rate_limit_rate)
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR)
+
+def start_app(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.llm_port}",
+        "LOOP_LAG_MONITOR": "true",
+        "PIPELINE_EAGER_LOAD": "true"
+    })
+    env.setdefault("GROQ_API_KEY", "fake-llm")
+    if not args.keep_caches:
+        env.update({"RESPONSE_CACHE_ENABLED": "false", "SEMANTIC_CACHE_ENABLED": "false", "AGENT_CACHE_ENABLED": "false"})
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(args.app_port), "--log-level", "warning"
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(1)
+    raise TimeoutError(f"App not ready after {timeout:.0f}s")
+
+async def run(args) -> dict:
+    queries = [json.loads(line)["query"] for line in open(args.queries) if line.strip()]
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    timeout = httpx.Timeout(args.request_timeout)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        logger.info(f"Waiting for {args.url}/ready")
+        await wait_ready(client, args.ready_timeout)
+
+        mix = dict(args.mix)
+        load = LoadTest(client, queries, mix, args.validation, args.seed)
+        if set(mix) - {"search"} and not await load.login():
+            mix = {"search": mix.get("search", 1.0)}
+            load.mix = mix
+        if "citations" in mix and not await load.prime_citations():
+            logger.warning("No saved search returned sources; citations are skipped")
+            del mix["citations"]
+            mix.setdefault("search", 1.0)
+
+        levels = []
+        for concurrency in args.concurrency:
+            await client.get("/loop-lag", params={"reset": True})
+            started = time.perf_counter()
+            samples = await load.run_level(concurrency, args.duration)
+            elapsed = time.perf_counter() - started
+            response = await client.get("/loop-lag", params={"reset": True})
+            # Only served when the app runs with LOOP_LAG_MONITOR=true
+            loop_lag = response.json() if response.status_code == 200 else {}
+
+            endpoints = {endpoint: summarize(endpoint_samples, elapsed) for endpoint, endpoint_samples in samples.items()}
+            total = sum(len(endpoint_samples) for endpoint_samples in samples.values())
+            level = {
+                "concurrency": concurrency,
+                "throughput_rps": round(total / elapsed, 2),
+                "endpoints": endpoints,
+                "loop_lag": loop_lag
+            }
+            levels.append(level)
+
+            print(f"\nconcurrency={concurrency}  throughput={level['throughput_rps']} req/s  "
+                  f"loop lag p50={loop_lag.get('p50_ms')}ms p99={loop_lag.get('p99_ms')}ms max={loop_lag.get('max_ms')}ms")
+            for endpoint, summary in endpoints.items():
+                if summary["requests"]:
+                    print(f"  {endpoint:<10} {summary['requests']:>6} req  {summary['throughput_rps']:>7} req/s  "
+                          f"p50 {summary['p50_ms']:>8}ms  p95 {summary['p95_ms']:>8}ms  "
+                          f"p99 {summary['p99_ms']:>8}ms  errors {summary['error_rate']:.1%}")
+
+        return {
+            "config": {
+                "duration_s": args.duration,
+                "mix": mix,
+                "validation": args.validation,
+                "llm_latency_ms": args.llm_latency_ms,
+                "llm_tokens_per_second": args.llm_tokens_per_second,
+                "llm_error_rate": args.llm_error_rate,
+                "llm_rate_limit_rate": args.llm_rate_limit_rate,
+                "caches": args.keep_caches
+            },
+            "levels": levels
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test MediSearch against a fake LLM")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 4, 16, 32])
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=8,history=1,citations=1"))
+    parser.add_argument("--validation", default="heuristic", choices=["none", "heuristic", "llm", "auto"])
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES)
+    parser.add_argument("--url", default=None, help="Test a running app instead of starting one")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--llm-port", type=int, default=8101)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400)
+    parser.add_argument("--llm-completion-tokens", type=int, default=150)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--ready-timeout", type=float, default=600)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    processes: List[subprocess.Popen] = []
+    if args.url is None:
+        args.url = f"http://127.0.0.1:{args.app_port}"
+        processes.append(start_fake_llm(args))
+        processes.append(start_app(args))
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        logger.info(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
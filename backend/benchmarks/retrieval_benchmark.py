@@ -0,0 +1,244 @@
+"""Offline retrieval benchmark: per-stage latency and ranking quality.
+
+    python -m benchmarks.retrieval_benchmark --repeat 5 --output results.json
+    python -m benchmarks.retrieval_benchmark --judgments qrels.json --baseline results.json
+
+Runs a fixed query set against the local vector store through
+`RAGPipeline.retrieve`, the path searches take (filter push-down,
+hybrid_search with its paper-collapse over-fetch rounds, the low-score
+fallback), and reports the stage timings the pipeline itself records:
+filter, bm25, semantic (ChromaDB), fusion and build_sources. bm25 and
+semantic run concurrently, so stages do not add up to the total. The
+query embedding is computed up front, bypassing the embedding cache, so
+the PubMedBERT tokenizer (tokenize) and forward pass (forward) are
+timed separately. No LLM calls are made.
+
+Queries are JSONL: {"id": ..., "query": ..., "filters": {SearchFilters}}.
+Judgments are JSON: {"<query id>": {"<paper id>": <grade>, ...}}, where
+grades above zero are relevant; they add recall@k and nDCG@k.
+
+Results are written as JSON; --baseline prints the change against an
+earlier run so two commits can be compared.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import collect_timings
+from app.models.schemas import SearchFilters, SearchRequest
+from app.services.rag.rag_pipeline import RAGPipeline
+
+logger = logging.getLogger("benchmarks.retrieval")
+
+DEFAULT_QUERIES = Path(__file__).with_name("queries.jsonl")
+STAGES = ("tokenize", "forward", "filter", "bm25", "semantic", "fusion", "build_sources", "total")
+PERCENTILES = (50, 95, 99)
+
+def load_queries(path: Path) -> List[dict]:
+    queries = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                queries.append(json.loads(line))
+    return queries
+
+def load_judgments(path: Optional[Path]) -> Dict[str, Dict[str, float]]:
+    if path is None:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def recall_at_k(ranking: List[str], grades: Dict[str, float], k: int) -> Optional[float]:
+    relevant = {paper_id for paper_id, grade in grades.items() if grade > 0}
+    if not relevant:
+        return None
+    return len(relevant.intersection(ranking[:k])) / len(relevant)
+
+def ndcg_at_k(ranking: List[str], grades: Dict[str, float], k: int) -> Optional[float]:
+    """Graded nDCG with exponential gain"""
+    ideal = sorted((g for g in grades.values() if g > 0), reverse=True)[:k]
+    if not ideal:
+        return None
+    dcg = sum((2 ** grades.get(paper_id, 0) - 1) / math.log2(i + 2) for i, paper_id in enumerate(ranking[:k]))
+    idcg = sum((2 ** grade - 1) / math.log2(i + 2) for i, grade in enumerate(ideal))
+    return dcg / idcg
+
+def summarize(samples: List[float]) -> dict:
+    values = np.array(samples) * 1000
+    summary = {f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    summary["mean_ms"] = round(float(values.mean()), 3)
+    summary["count"] = len(samples)
+    return summary
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class RetrievalBenchmark:
+    """Times the retrieval stages of one pipeline over a query set"""
+
+    def __init__(self, pipeline: RAGPipeline, top_k: int):
+        self.pipeline = pipeline
+        self.top_k = top_k
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    async def run_query(self, query: str, filters: Optional[SearchFilters]) -> Tuple[List[str], int]:
+        """One search through the pipeline; returns the ranked paper ids and over-fetch rounds"""
+        pipeline = self.pipeline
+        backend = pipeline.embedding_backend
+        timings = dict.fromkeys(STAGES, 0.0)
+        clock = time.perf_counter
+        started = clock()
+
+        with collect_timings() as recorded:
+            t = clock()
+            encoded = backend.tokenize([pipeline.expand_query(query)])
+            timings["tokenize"] = clock() - t
+
+            t = clock()
+            embedding = backend.forward(encoded)[0].tolist()
+            timings["forward"] = clock() - t
+
+            request = SearchRequest(query=query, top_k=self.top_k, filters=filters)
+            sources, _ = await pipeline.retrieve(request, query_embedding=embedding)
+
+        timings["total"] = clock() - started
+        # Stages repeated by over-fetch rounds are summed, as in Server-Timing
+        for stage, seconds in recorded:
+            if stage in timings:
+                timings[stage] += seconds
+        for stage, seconds in timings.items():
+            self.timings[stage].append(seconds)
+
+        rounds = sum(1 for stage, _ in recorded if stage == "bm25")
+        # Papers in rank order, each counted once
+        return list(dict.fromkeys(source.paper_id for source in sources)), rounds
+
+    async def run(self, queries: List[Tuple[str, str, Optional[SearchFilters]]], repeat: int, warmup: int):
+        """Untimed warm-up passes, then timed passes; returns {query id: (papers, rounds)}"""
+        for _ in range(warmup):
+            for _, query, filters in queries:
+                await self.run_query(query, filters)
+        self.timings = {stage: [] for stage in STAGES}
+
+        results: Dict[str, Tuple[List[str], int]] = {}
+        for _ in range(repeat):
+            for query_id, query, filters in queries:
+                results[query_id] = await self.run_query(query, filters)
+        return results
+
+def compare(results: dict, baseline: dict):
+    print(f"\nChange against baseline {baseline['meta'].get('commit') or '(unknown commit)'}:")
+    for stage, summary in results["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before:
+            continue
+        deltas = []
+        for p in PERCENTILES:
+            key = f"p{p}_ms"
+            if before[key]:
+                deltas.append(f"{key} {100 * (summary[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {stage:<14} " + "  ".join(deltas))
+    for metric, value in results.get("quality", {}).items():
+        before = baseline.get("quality", {}).get(metric)
+        if isinstance(value, float) and isinstance(before, float):
+            print(f"  {metric:<14} {value:.4f} ({value - before:+.4f})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MediSearch retrieval stages")
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES)
+    parser.add_argument("--judgments", type=Path, default=None)
+    parser.add_argument("--top-k", type=int, default=settings.TOP_K_RETRIEVAL)
+    parser.add_argument("--k", type=int, default=10, help="Cutoff for recall@k and nDCG@k")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the query set")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes before measuring")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    queries = load_queries(args.queries)
+    judgments = load_judgments(args.judgments)
+
+    logger.info(f"Loading pipeline from {settings.CHROMADB_PATH}")
+    pipeline = RAGPipeline()
+    # Per-stage logging would dominate the measured stages
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    benchmark = RetrievalBenchmark(pipeline, args.top_k)
+    parsed = [
+        (q["id"], q["query"], SearchFilters(**q["filters"]) if q.get("filters") else None)
+        for q in queries
+    ]
+    try:
+        results_by_query = asyncio.run(benchmark.run(parsed, args.repeat, args.warmup))
+    finally:
+        pipeline.close()
+
+    per_query = {}
+    for query_id, (ranking, rounds) in results_by_query.items():
+        grades = judgments.get(query_id)
+        entry = {"papers": ranking, "rounds": rounds}
+        if grades:
+            entry[f"recall@{args.k}"] = recall_at_k(ranking, grades, args.k)
+            entry[f"ndcg@{args.k}"] = ndcg_at_k(ranking, grades, args.k)
+        per_query[query_id] = entry
+
+    quality = {}
+    for metric in (f"recall@{args.k}", f"ndcg@{args.k}"):
+        values = [entry[metric] for entry in per_query.values() if entry.get(metric) is not None]
+        if values:
+            quality[metric] = round(float(np.mean(values)), 4)
+    if quality:
+        quality["judged_queries"] = len([q for q in results_by_query if judgments.get(q)])
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "queries": len(parsed),
+            "repeat": args.repeat,
+            "top_k": args.top_k,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "embedding_backend": pipeline.embedding_backend.name,
+            "collapse": (
+                f"{settings.COLLAPSE_POOLING}:{settings.COLLAPSE_CHUNKS_PER_PAPER}"
+                if settings.COLLAPSE_BY_PAPER else None
+            )
+        },
+        "stages": {stage: summarize(samples) for stage, samples in benchmark.timings.items() if samples},
+        "quality": quality,
+        "per_query": per_query
+    }
+
+    print(f"\n{'stage':<14} " + " ".join(f"{f'p{p} ms':>10}" for p in PERCENTILES))
+    for stage, summary in results["stages"].items():
+        print(f"{stage:<14} " + " ".join(f"{summary[f'p{p}_ms']:>10.2f}" for p in PERCENTILES))
+    for metric, value in quality.items():
+        print(f"{metric}: {value}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        logger.info(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, json.loads(args.baseline.read_text()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+
+# Settings without defaults; the tests never reach MongoDB or the LLM API
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.cache.response_cache import ResponseCache, SharedResponseBackend
+
+class InMemoryRedis:
+    """Stand-in for redis.asyncio.Redis: get/set with expiry, optional failures"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.fail = False
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data[key] = value
+        self.expiry[key] = ex
+
+def make_cache(client, ttl_seconds=60):
+    return ResponseCache(SharedResponseBackend(client, ttl_seconds=ttl_seconds), ttl_seconds)
+
+def test_concurrent_misses_share_one_computation():
+    async def scenario():
+        client = InMemoryRedis()
+        cache = make_cache(client)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"answer": "shared"}
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+        assert results == [{"answer": "shared"}] * 5
+        assert calls == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["coalesced"] == 4
+        assert cache.stats()["in_flight"] == 0
+        assert json.loads(client.data["medisearch:response:k"]) == {"answer": "shared"}
+        assert client.expiry["medisearch:response:k"] == 60
+
+    asyncio.run(scenario())
+
+def test_other_worker_reads_shared_value():
+    async def scenario():
+        client = InMemoryRedis()
+
+        async def compute():
+            return {"answer": "first"}
+
+        async def must_not_compute():
+            raise AssertionError("value should come from the shared backend")
+
+        await make_cache(client).get_or_compute("k", compute)
+        other_worker = make_cache(client)
+        assert await other_worker.get_or_compute("k", must_not_compute) == {"answer": "first"}
+        assert other_worker.stats()["hits"] == 1
+        assert other_worker.backend.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        client = InMemoryRedis()
+        cache = make_cache(client)
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            raise RuntimeError("llm down")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", failing) for _ in range(3)),
+            return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert calls == 1
+        assert client.data == {}
+        assert cache.stats()["in_flight"] == 0
+
+        async def compute():
+            return {"answer": "recovered"}
+
+        assert await cache.get_or_compute("k", compute) == {"answer": "recovered"}
+
+    asyncio.run(scenario())
+
+def test_cancelled_caller_does_not_cancel_shared_computation():
+    async def scenario():
+        client = InMemoryRedis()
+        cache = make_cache(client)
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return {"answer": "done"}
+
+        first = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        release.set()
+
+        assert await second == {"answer": "done"}
+        assert json.loads(client.data["medisearch:response:k"]) == {"answer": "done"}
+        assert cache.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_backend_outage_degrades_to_recomputing():
+    async def scenario():
+        client = InMemoryRedis()
+        client.fail = True
+        cache = make_cache(client)
+
+        async def compute():
+            return {"answer": "fresh"}
+
+        assert await cache.get_or_compute("k", compute) == {"answer": "fresh"}
+        # One failed read and one failed write, neither raised
+        assert cache.backend.stats()["errors"] == 2
+        assert client.data == {}
+
+    asyncio.run(scenario())
+
+def test_rejected_values_are_shared_but_not_stored():
+    async def scenario():
+        client = InMemoryRedis()
+        cache = make_cache(client)
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            return {"answer": "degraded"}
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", compute, cacheable=lambda value: False) for _ in range(2))
+        )
+        assert results == [{"answer": "degraded"}] * 2
+        assert client.data == {}
+
+    asyncio.run(scenario())
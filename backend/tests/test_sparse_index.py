@@ -0,0 +1,79 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.rag.sparse_index import SparseIndex, tokenize
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+# Frequent words get negative raw IDF, which BM25Okapi floors with epsilon
+COMMON = ["the", "of", "patients", "study"]
+VOCABULARY = COMMON + [f"term{i}" for i in range(60)]
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(7)
+    weights = [30] * len(COMMON) + [1] * (len(VOCABULARY) - len(COMMON))
+    texts = []
+    for _ in range(400):
+        words = rng.choices(VOCABULARY, weights=weights, k=rng.randint(3, 40))
+        texts.append(" ".join(words))
+    texts.append("")
+    return texts
+
+@pytest.fixture(scope="module")
+def index(corpus, tmp_path_factory):
+    path = tmp_path_factory.mktemp("sparse") / "bm25"
+    return SparseIndex.build(path, ((f"doc{i}", text) for i, text in enumerate(corpus)), {"test": True})
+
+@pytest.fixture(scope="module")
+def reference(corpus):
+    return rank_bm25.BM25Okapi([tokenize(text) for text in corpus])
+
+def queries():
+    rng = random.Random(11)
+    generated = [
+        ["term1"],
+        ["the", "of"],
+        ["term3", "term3", "patients"],
+        ["term5", "unknownword", "study"],
+        ["unknownword"]
+    ]
+    for _ in range(40):
+        generated.append(rng.sample(VOCABULARY, rng.randint(1, 6)))
+    return generated
+
+def expected_top_k(scores: np.ndarray, k: int):
+    rows = np.flatnonzero(scores > 0)
+    return sorted(((int(row), float(scores[row])) for row in rows), key=lambda hit: -hit[1])[:k]
+
+def assert_same_top_k(hits, expected, scores):
+    assert len(hits) == len(expected)
+    np.testing.assert_allclose([score for _, score in hits], [score for _, score in expected], rtol=1e-9)
+    for row, score in hits:
+        assert score == pytest.approx(scores[row], rel=1e-9)
+    # Rows may only differ among ties at the cut-off
+    if expected:
+        cutoff = expected[-1][1]
+        above = {row for row, score in expected if score > cutoff * (1 + 1e-9)}
+        assert above <= {row for row, _ in hits}
+
+@pytest.mark.parametrize("query", queries())
+def test_get_scores_match_bm25okapi(index, reference, query):
+    np.testing.assert_allclose(index.get_scores(query), reference.get_scores(query), rtol=1e-9, atol=1e-12)
+
+@pytest.mark.parametrize("k", [1, 5, 50, 1000])
+@pytest.mark.parametrize("query", queries())
+def test_top_k_matches_bm25okapi(index, reference, query, k):
+    scores = reference.get_scores(query)
+    assert_same_top_k(index.top_k(query, k), expected_top_k(scores, k), scores)
+
+@pytest.mark.parametrize("k", [1, 10, 1000])
+@pytest.mark.parametrize("query", queries())
+def test_top_k_with_allowed_mask_matches_bm25okapi(index, reference, query, k):
+    allowed = np.random.default_rng(3).random(index.num_docs) < 0.3
+    scores = np.where(allowed, reference.get_scores(query), 0.0)
+    hits = index.top_k(query, k, allowed)
+    assert all(allowed[row] for row, _ in hits)
+    assert_same_top_k(hits, expected_top_k(scores, k), scores)
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.cache.tiered_cache import build_tiered_cache
+
+def test_async_disk_tier_runs_on_executor(tmp_path):
+    async def scenario():
+        loop_thread = threading.get_ident()
+        disk_threads = []
+        cache = build_tiered_cache(max_entries=8, disk_path=str(tmp_path / "cache.sqlite3"))
+        disk_get, disk_set = cache.disk.get, cache.disk.set
+
+        def record_get(*args):
+            disk_threads.append(threading.get_ident())
+            return disk_get(*args)
+
+        def record_set(*args):
+            disk_threads.append(threading.get_ident())
+            return disk_set(*args)
+
+        cache.disk.get, cache.disk.set = record_get, record_set
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            await cache.aset("k", [1.0, 2.0], executor)
+            cache.memory.clear()
+            assert await cache.aget("k", executor) == [1.0, 2.0]
+            assert await cache.aget("missing", executor, default="none") == "none"
+        assert len(disk_threads) == 3
+        assert loop_thread not in disk_threads
+        # The disk hit was promoted, so the next lookup never leaves memory
+        assert cache.memory.get("k") == [1.0, 2.0]
+
+    asyncio.run(scenario())
+
+def test_async_memory_hit_skips_disk(tmp_path):
+    async def scenario():
+        cache = build_tiered_cache(max_entries=8, disk_path=str(tmp_path / "cache.sqlite3"))
+        cache.memory.set("k", "value")
+        assert await cache.aget("k") == "value"
+        assert cache.disk.stats()["hits"] + cache.disk.stats()["misses"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,87 @@
+import asyncio
+
+from app.models.schemas import (
+    ClinicalValidation, ContradictionAnalysis, MultiAgentValidation, StatisticalValidation, ValidationTier
+)
+from app.services.validation.tiers import TieredValidator
+
+def verdict(confidence: float, flags=()) -> MultiAgentValidation:
+    return MultiAgentValidation(
+        clinical_expert=ClinicalValidation(
+            confidence=confidence, reasoning="", flags=list(flags), clinical_relevance=confidence, safety_concerns=[]
+        ),
+        statistical_validator=StatisticalValidation(
+            confidence=confidence, reasoning="", flags=[], statistical_score=confidence, methodology_notes=""
+        ),
+        contradiction_detector=ContradictionAnalysis(
+            confidence=confidence, reasoning="", flags=[], contradiction_level="low", conflicting_sources=[]
+        ),
+        overall_confidence=confidence
+    )
+
+HEURISTIC = verdict(0.6)
+LLM = verdict(0.9)
+
+class FakeHeuristic:
+    async def validate(self, query, answer, sources):
+        return HEURISTIC
+
+class FakeLLM:
+    def __init__(self, delay: float, result: MultiAgentValidation = LLM):
+        self.delay = delay
+        self.result = result
+        self.finished = False
+
+    async def validate(self, answer, sources):
+        await asyncio.sleep(self.delay)
+        self.finished = True
+        return self.result
+
+def make_validator(llm: FakeLLM) -> TieredValidator:
+    validator = TieredValidator()
+    validator.heuristic = FakeHeuristic()
+    validator._llm = llm
+    return validator
+
+def run_auto(validator: TieredValidator, budget_ms: int):
+    return validator.validate(ValidationTier.AUTO, "query", "answer", [], budget_ms)
+
+def test_auto_attaches_llm_verdict_within_budget():
+    async def scenario():
+        validation, tier, llm_validation = await run_auto(make_validator(FakeLLM(0.01)), 1000)
+        assert (validation, tier, llm_validation) == (HEURISTIC, ValidationTier.HEURISTIC, LLM)
+
+    asyncio.run(scenario())
+
+def test_auto_returns_heuristic_first_and_finishes_slow_llm_in_background():
+    async def scenario():
+        llm = FakeLLM(0.2)
+        validator = make_validator(llm)
+        stages = validator.validate_stages(ValidationTier.AUTO, "query", "answer", [], 50)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await stages.__anext__() == ("validation", HEURISTIC, ValidationTier.HEURISTIC)
+        assert loop.time() - started < 0.04
+        assert [stage async for stage in stages] == []
+
+        assert not llm.finished
+        await asyncio.sleep(0.25)
+        assert llm.finished
+        assert not validator._background
+
+    asyncio.run(scenario())
+
+def test_auto_does_not_attach_failed_llm_verdict():
+    async def scenario():
+        failed = FakeLLM(0.01, verdict(0.5, flags=["validation_error"]))
+        assert await run_auto(make_validator(failed), 1000) == (HEURISTIC, ValidationTier.HEURISTIC, None)
+
+    asyncio.run(scenario())
+
+def test_llm_and_none_tiers():
+    async def scenario():
+        validator = make_validator(FakeLLM(0.01))
+        assert await validator.validate(ValidationTier.LLM, "q", "a", []) == (LLM, ValidationTier.LLM, None)
+        assert await validator.validate(ValidationTier.NONE, "q", "a", []) == (None, None, None)
+
+    asyncio.run(scenario())